@@ -0,0 +1,104 @@
+"""
+Micro-benchmarks of `haferml.blend.config.Config` on a synthetic config.
+
+```
+python benchmarks/bench_config.py 10000
+```
+"""
+
+import copy
+import os
+import sys
+import tempfile
+import time
+
+import simplejson as json
+from haferml.blend.config import Config, load_cached_config
+from loguru import logger
+
+logger.remove()
+logger.add(sys.stderr, level="WARNING")
+
+
+def generate_config(n_leaves, wide=False):
+    """
+    generate_config creates a config of models and artifacts with about `n_leaves`
+    leaves, each artifact has a `local`, `name` and `remote` key.
+
+    With `wide=True`, all the artifacts are at the top level of the config.
+    """
+    n_artifacts = max(n_leaves // 3, 1)
+    if wide:
+        return {
+            f"artifact_{i}": {
+                "local": f"data/{i}",
+                "name": f"artifact_{i}.parquet",
+                "remote": f"s3://bucket/{i}",
+            }
+            for i in range(n_artifacts)
+        }
+
+    config = {"etl": {}, "model": {}}
+    for i in range(n_artifacts):
+        section = "etl" if i % 4 == 0 else "model"
+        group = config[section].setdefault(f"group_{i // 100}", {"artifacts": {}})
+        group["artifacts"][f"artifact_{i}"] = {
+            "local": f"data/{section}/{i}",
+            "name": f"artifact_{i}.parquet",
+            "remote": f"s3://bucket/{section}/{i}",
+        }
+
+    return config
+
+
+def bench(name, func, repeat=3):
+    """
+    bench runs `func` and reports the best time in milliseconds.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f"{name:<32} {best * 1000:>12,.2f} ms")
+
+
+if __name__ == "__main__":
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    config = generate_config(n)
+    configs = [copy.deepcopy(config) for _ in range(3)]
+    wide_configs = [generate_config(n, wide=True) for _ in range(3)]
+
+    bench("Config (nested)", lambda: Config(configs.pop(), base_folder="/tmp"))
+    bench("Config (wide)", lambda: Config(wide_configs.pop(), base_folder="/tmp"))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, "config.json")
+        with open(config_path, "w") as fp:
+            json.dump(config, fp)
+
+        bench("Config (file)", lambda: Config(config_path, base_folder="/tmp"))
+        Config(config_path, base_folder="/tmp", snapshot=True)
+        bench(
+            "Config (file, snapshot)",
+            lambda: Config(config_path, base_folder="/tmp", snapshot=True),
+        )
+        bench(
+            "load_cached_config (file)",
+            lambda: load_cached_config(config_path, base_folder="/tmp"),
+        )
+
+    conf = Config(copy.deepcopy(config), base_folder="/tmp")
+    path = ["model", "group_1", "artifacts", "artifact_101", "name_absolute"]
+    bench("100k lookups", lambda: [conf[path] for _ in range(100000)])
+
+    frozen_conf = Config(copy.deepcopy(config), base_folder="/tmp", frozen=True)
+    path = ["model", "group_1", "artifacts", "artifact_101"]
+    bench(
+        "100k lookups (deepcopy)",
+        lambda: [copy.deepcopy(conf[path]) for _ in range(100000)],
+    )
+    bench("100k lookups (frozen)", lambda: [frozen_conf[path] for _ in range(100000)])
@@ -0,0 +1,83 @@
+"""
+Scaling of `Transformer.transform_many` with the number of worker processes.
+
+```
+python benchmarks/bench_transform_many.py 200000 1 2 4 8
+```
+
+The script reports
+
+1. the throughput for each number of workers,
+2. the throughput for different `chunk_size` with the largest number of workers,
+3. the time to start the pool of workers,
+4. the time per record spent in the main process to send the records to the
+   workers and to receive the results (pickling), which can not be parallelized
+   and limits the speedup to about `transform / pickling`.
+
+The first number of workers should be 1, which is the baseline.
+"""
+
+import os
+import pickle
+import sys
+import time
+
+from bench_transformer import SCHEMA, generate_records
+from haferml.etl.transform.pipeline import Transformer
+from loguru import logger
+
+logger.remove()
+logger.add(sys.stderr, level="WARNING")
+
+
+def bench(transformer, records, workers, chunk_size):
+    """
+    bench runs `transform_many` and returns the elapsed seconds.
+    """
+    start = time.perf_counter()
+    transformer.transform_many(records, workers=workers, chunk_size=chunk_size)
+
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    all_workers = [int(w) for w in sys.argv[2:]] or [1, 2, 4, 8]
+    records = generate_records(n)
+    transformer = Transformer(SCHEMA)
+
+    print(f"{n} records, {os.cpu_count()} CPUs")
+    baseline = None
+    for workers in all_workers:
+        elapsed = bench(transformer, records, workers, chunk_size=5000)
+        baseline = elapsed if baseline is None else baseline
+        print(
+            f"workers={workers:<3} {n / elapsed:>12,.0f} records/sec "
+            f"speedup {baseline / elapsed:.2f}x"
+        )
+
+    workers = max(all_workers)
+    for chunk_size in [10, 100, 1000, 5000, 20000]:
+        elapsed = bench(transformer, records, workers, chunk_size=chunk_size)
+        print(
+            f"workers={workers:<3} chunk_size={chunk_size:<6} "
+            f"{n / elapsed:>12,.0f} records/sec"
+        )
+
+    elapsed = bench(transformer, records[:workers], workers, chunk_size=1)
+    print(f"workers={workers:<3} pool startup {elapsed * 1000:,.0f} ms")
+
+    # the serial part in the main process: pickling the chunks and the results
+    chunk = records[:5000]
+    transformed = transformer.transform_many(chunk, workers=1)
+    start = time.perf_counter()
+    pickle.loads(pickle.dumps(chunk))
+    pickle.loads(pickle.dumps(transformed))
+    pickling = (time.perf_counter() - start) / len(chunk)
+    transform = baseline / n
+    print(
+        f"transform {transform * 1e6:.1f} us/record, "
+        f"pickling {pickling * 1e6:.1f} us/record, "
+        f"speedup limit ~{transform / pickling:.0f}x"
+    )
@@ -0,0 +1,96 @@
+"""
+Micro-benchmarks of `haferml.etl.transform.pipeline.Transformer`.
+
+```
+python benchmarks/bench_transformer.py
+```
+"""
+
+import copy
+import random
+import sys
+import time
+
+import pandas as pd
+from haferml.etl.transform.pipeline import Transformer
+from loguru import logger
+
+logger.remove()
+logger.add(sys.stderr, level="WARNING")
+
+
+SCHEMA = [
+    {"column_name": "name", "type": "str"},
+    {"column_name": "status", "type": "string"},
+    {"column_name": "count", "type": "int"},
+    {"column_name": "price", "type": "float"},
+    {"column_name": "amount", "type": "float"},
+    {"column_name": "active", "type": "bool"},
+    {"column_name": "tags", "type": "list"},
+    {"column_name": "created_at", "type": "datetime"},
+]
+
+
+def generate_records(n, seed=42):
+    """
+    generate_records creates `n` synthetic raw records for the `SCHEMA`.
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            "name": f" name {rng.randint(0, 1000)} ",
+            "status": rng.choice(["new", "paid", "shipped", None]),
+            "count": str(rng.randint(0, 100)),
+            "price": f"{rng.randint(1, 999)},{rng.randint(0, 99):02d}",
+            "amount": rng.random() * 100,
+            "active": rng.choice(["yes", "no", "1", "0"]),
+            "tags": "[1, 2, 3]",
+            "created_at": f"2021-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} "
+            f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00",
+        }
+        for _ in range(n)
+    ]
+
+
+def bench(name, func, records, repeat=3):
+    """
+    bench runs `func` on fresh copies of `records` and reports the best records/sec.
+    """
+    best = None
+    for _ in range(repeat):
+        data = copy.deepcopy(records)
+        start = time.perf_counter()
+        func(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f"{name:<32} {len(records) / best:>12,.0f} records/sec")
+
+
+if __name__ == "__main__":
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    records = generate_records(n)
+    transformer = Transformer(SCHEMA)
+
+    bench(
+        "transform (record at a time)",
+        lambda d: [transformer.transform(r) for r in d],
+        records,
+    )
+    transformer_with_stats = Transformer(SCHEMA, collect_stats=True)
+    bench(
+        "transform (collect_stats=True)",
+        lambda d: [transformer_with_stats.transform(r) for r in d],
+        records,
+    )
+    bench(
+        "transform_stream (batches)",
+        lambda d: [b for b in transformer.transform_stream(d, batch_size=10000)],
+        records,
+    )
+    bench(
+        "transform_dataframe (columns)",
+        lambda d: transformer.transform_dataframe(pd.DataFrame(d)),
+        records,
+    )
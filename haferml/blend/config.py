@@ -1,7 +1,14 @@
+import copy
+import hashlib
 import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
 from loguru import logger
 import simplejson as json
-from haferml.data.wrangle.misc import get_all_paths_in_dict as _get_all_paths_in_dict
+from haferml.version import __version__
 from haferml.data.wrangle.misc import (
     update_dict_recursively as _update_dict_recursively,
 )
@@ -60,8 +67,11 @@ def get_config(configs, path):
         logger.warning(f"path is not list nor tuple, converting to list: {path}")
         path = [path]
 
+    if not path:
+        return configs.copy()
+
     # Find the values
-    res = configs.copy()
+    res = configs
     for p in path:
         res = res[p]
 
@@ -111,6 +121,148 @@ def construct_paths(config, base_folder):
     return {**config, **config_recon}
 
 
+CONFIG_SNAPSHOT_VERSION = 1
+
+_MISSING = object()
+
+
+def _write_config_snapshot(snapshot_path, header, data):
+    """
+    _write_config_snapshot writes the header and the data of the config snapshot.
+
+    The snapshot is written to a temporary file which then replaces the snapshot, so
+    that other processes never read a partially written snapshot. Failures are
+    logged as warnings as the snapshot is only a cache.
+    """
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(snapshot_path)),
+            prefix=os.path.basename(snapshot_path),
+            suffix=".tmp",
+        )
+        with os.fdopen(fd, "wb") as fp:
+            pickle.dump(header, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+    except Exception as e:
+        logger.warning(f"Could not write config snapshot {snapshot_path}: {e}")
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class ConfigView(Mapping):
+    """
+    ConfigView is a read only view of a dictionary in a frozen `Config`.
+
+    The view does not copy the dictionary. The nested dictionaries and lists are also
+    returned as read only views.
+
+    :param data: the dictionary to be viewed
+    :type data: dict
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data):
+        self._data = data
+
+    def __getitem__(self, key):
+        return _read_only(self._data[key])
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"ConfigView({self._data!r})"
+
+    def to_dict(self):
+        """
+        to_dict copies the viewed dictionary to a new dictionary.
+
+        :return: deep copy of the dictionary
+        :rtype: dict
+        """
+        return copy.deepcopy(self._data)
+
+
+class ConfigListView(Sequence):
+    """
+    ConfigListView is a read only view of a list in a frozen `Config`.
+
+    :param data: the list to be viewed
+    :type data: list
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data):
+        self._data = data
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ConfigListView(self._data[index])
+        return _read_only(self._data[index])
+
+    def __len__(self):
+        return len(self._data)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, ConfigListView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"ConfigListView({self._data!r})"
+
+    def to_list(self):
+        """
+        to_list copies the viewed list to a new list.
+
+        :return: deep copy of the list
+        :rtype: list
+        """
+        return copy.deepcopy(self._data)
+
+
+def _read_only(value):
+    """
+    _read_only wraps dictionaries and lists in read only views.
+    """
+    if isinstance(value, dict):
+        return ConfigView(value)
+    elif isinstance(value, list):
+        return ConfigListView(value)
+
+    return value
+
+
+def _index_config(config):
+    """
+    _index_config builds the index of the values of all the paths of keys in the
+    config.
+
+    :param config: the config
+    :type config: dict
+    :return: tuple of the keys -> value
+    :rtype: dict
+    """
+    index = {}
+    stack = [((), config)]
+    while stack:
+        path, node = stack.pop()
+        for k, v in node.items():
+            k_path = path + (k,)
+            index[k_path] = v
+            if isinstance(v, dict):
+                stack.append((k_path, v))
+
+    return index
+
+
 class Config:
     """
     Config makes it easy to load and use config files.
@@ -122,29 +274,135 @@ class Config:
     conf[["etl", "raw"]]
     ```
 
+    The values of all the paths of keys in a frozen config are indexed when the
+    config is loaded, so that a lookup is a single dictionary access. Paths that are
+    not in the index, e.g., with list indices, and all the paths of configs that are
+    not frozen are looked up using `get_config`, so that the values changed in place
+    are returned.
+
+    A frozen config, e.g., the shared instances from `load_cached_config`, can not be
+    changed using `set`. The dictionaries and lists in a frozen config are returned as
+    read only views (`ConfigView`) without copying the values; use `to_dict` of the
+    view or the config to get a copy that can be changed.
+
+    ```
+    conf = Config(file_path="test.json", base_folder="/tmp", frozen=True)
+    conf[["etl", "raw"]]["local"] = "abc"  # raises TypeError
+    raw = conf[["etl", "raw"]].to_dict()
+    ```
+
+    With `snapshot=True`, the enhanced config is written to a snapshot file next to
+    the config file, `<config_path>.snapshot`, which is loaded instead of the config
+    file as long as the config file is not changed.
+
     :param file_path: path to the config file. If the path is relative path, please specify the base folder.
     :type file_path: str
     :param base_folder: the base folder for our working directory, defaults to None
     :type base_folder: str, optional
+    :param frozen: whether the config is read only, defaults to False
+    :type frozen: bool, optional
+    :param snapshot: whether to use the snapshot of the config file, defaults to False
+    :type snapshot: bool, optional
     """
 
-    def __init__(self, config, base_folder=None):
+    def __init__(self, config, base_folder=None, frozen=None, snapshot=None):
 
         if base_folder is not None:
             logger.info(f"Using base folder: {base_folder}")
+        if frozen is None:
+            frozen = False
+        if snapshot is None:
+            snapshot = False
 
         self.base_folder = base_folder
+        self.frozen = frozen
 
-        if isinstance(config, str):
-            self.config = load_config(config_path=config, base_folder=base_folder)
-        elif isinstance(config, dict):
-            self.config = config
+        if isinstance(config, str) and snapshot:
+            self._load_with_snapshot(config)
         else:
+            if isinstance(config, str):
+                self.config = load_config(config_path=config, base_folder=base_folder)
+            elif isinstance(config, dict):
+                self.config = config
+            else:
+                raise Exception(
+                    f"Input config is not supported, should be path or dict: {config}"
+                )
+
+            self._enhance_local_paths(self.config, base_folder=self.base_folder)
+            self.reindex()
+
+    def _load_with_snapshot(self, config_path):
+        """
+        _load_with_snapshot loads the config and the index from the snapshot of the
+        config file, which is a pickle file `<config_path>.snapshot` next to the
+        config file.
+
+        The snapshot contains the enhanced config and is only used if the hash of the
+        config file, the base folder and the version of the snapshot are the same as
+        in the header of the snapshot. Otherwise, the config file is loaded and the
+        snapshot is written again.
+
+        !!! warning
+            Pickle files can execute code when loaded, the snapshots should only be
+            used in trusted folders.
+
+        :param config_path: path to the config file
+        :type config_path: str
+        """
+        config_path = _resolve_config_path(config_path, self.base_folder)
+        if not os.path.exists(config_path):
             raise Exception(
-                f"Input config is not supported, should be path or dict: {config}"
+                f"config file path {config_path} does not exist! Beware of the relative path."
             )
 
+        with open(config_path, "rb") as fp:
+            source = fp.read()
+        header = {
+            "version": CONFIG_SNAPSHOT_VERSION,
+            "haferml": __version__,
+            "source_hash": hashlib.blake2b(source).hexdigest(),
+            "base_folder": self.base_folder,
+        }
+        snapshot_path = f"{config_path}.snapshot"
+
+        try:
+            with open(snapshot_path, "rb") as fp:
+                if pickle.load(fp) == header:
+                    logger.debug(f"Loading config from snapshot {snapshot_path}")
+                    self.config, index = pickle.load(fp)
+                    self._index = index if self.frozen else None
+                    return
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not load config snapshot {snapshot_path}: {e}")
+
+        logger.debug(f"Loading config from {config_path}")
+        self.config = json.loads(source)
+        if not self.config:
+            logger.warning(f"The config is empty: {self.config}")
         self._enhance_local_paths(self.config, base_folder=self.base_folder)
+        self.reindex()
+
+        # the index is kept in the snapshot for the frozen configs
+        index = self._index
+        if index is None:
+            index = _index_config(self.config)
+        _write_config_snapshot(snapshot_path, header, (self.config, index))
+
+    def reindex(self):
+        """
+        reindex rebuilds the index of the values of all the paths of keys in a frozen
+        config.
+
+        Configs that are not frozen are not indexed, as the values returned by `get`
+        can be changed in place.
+        """
+        if self.frozen:
+            self._index = _index_config(self.config)
+        else:
+            self._index = None
 
     def get(self, path):
         """
@@ -160,10 +418,57 @@ class Config:
         :return: configuration of for the specific path
         """
 
-        config = get_config(self.config, path)
+        config = _MISSING
+        if self._index is not None and isinstance(path, (list, tuple)):
+            # paths with list indices or unhashable keys are not in the index
+            try:
+                config = self._index[tuple(path)]
+            except (KeyError, TypeError):
+                pass
+        if config is _MISSING:
+            config = get_config(self.config, path)
+
+        if self.frozen:
+            return _read_only(config)
 
         return config
 
+    def to_dict(self):
+        """
+        to_dict copies the config to a new dictionary, which can be changed without
+        changing the config.
+
+        :return: deep copy of the config
+        :rtype: dict
+        """
+        return copy.deepcopy(self.config)
+
+    def set(self, path, value):
+        """
+        Set the value of a path in the configs.
+
+        The local paths are enhanced again. Only configs that are not frozen can be
+        changed, which are not indexed; the constant time lookups of the index
+        require `frozen=True` or `load_cached_config`.
+
+        ```
+        conf = Config(file_path="test.json", base_folder="/tmp")
+        conf.set(["etl", "raw", "local"], "data/raw")
+        ```
+
+        :param path: path to the specific configurations
+        :type path: list
+        :param value: the value of the path
+        """
+        if self.frozen:
+            raise Exception(f"Config is frozen, can not set {path}")
+        if not isinstance(path, (list, tuple)):
+            logger.warning(f"path is not list nor tuple, converting to list: {path}")
+            path = [path]
+
+        _update_dict_recursively(self.config, list(path), value)
+        self._enhance_local_paths(self.config, base_folder=self.base_folder)
+
     @staticmethod
     def _enhance_local_paths(config, base_folder=None):
         """
@@ -175,29 +480,155 @@ class Config:
         :type base_folder: str, optional
         """
 
-        all_paths = _get_all_paths_in_dict(config)
-
-        for p in all_paths:
-            if p[-1] == "local":
-                p_local_value = get_config(config, p)
-                p_local_parent_path = p[:-1]
+        # the dictionaries are visited once using a stack, without looking up the
+        # paths from the root
+        stack = [config]
+        while stack:
+            node = stack.pop()
+            children = [v for v in node.values() if isinstance(v, dict)]
 
+            if "local" in node and not isinstance(node["local"], dict):
+                local_value = node["local"]
                 if base_folder is not None:
-                    p_local_value = os.path.join(base_folder, p_local_value)
-                _update_dict_recursively(
-                    config, p_local_parent_path + ["local_absolute"], p_local_value
-                )
+                    local_value = os.path.join(base_folder, local_value)
+                node["local_absolute"] = local_value
 
-                p_local_parent_value = get_config(config, p_local_parent_path)
-                if "name" in p_local_parent_value:
-                    p_name_value = p_local_parent_value["name"]
-                    p_name_value = os.path.join(p_local_value, p_name_value)
-                    _update_dict_recursively(
-                        config, p_local_parent_path + ["name_absolute"], p_name_value
-                    )
+                if "name" in node:
+                    node["name_absolute"] = os.path.join(local_value, node["name"])
+
+            stack.extend(children)
 
     def __getitem__(self, item):
         return self.get(item)
 
+    def __setitem__(self, item, value):
+        self.set(item, value)
+
     def __str__(self) -> str:
         return f"{self.config}"
+
+
+CONFIG_CACHE_SIZE = 32
+
+_CONFIG_CACHE = OrderedDict()
+_CONFIG_CACHE_LOCK = threading.Lock()
+_CONFIG_CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def load_cached_config(config_path, base_folder=None, snapshot=None):
+    """
+    load_cached_config loads the config file as a frozen `Config` that is shared in
+    the process.
+
+    The configs are cached by the resolved path of the file, the modification time
+    of the file and the base folder. The file is loaded again if it is modified. At
+    most `CONFIG_CACHE_SIZE` configs are kept, the least recently used are dropped.
+
+    ```
+    conf = load_cached_config("config.json", base_folder="/tmp")
+    conf[["etl", "raw"]]
+    ```
+
+    !!! note
+        The config is shared by all the callers, so the values are returned as read
+        only views. Use `to_dict` to get a copy that can be changed.
+
+    :param config_path: path to the config file
+    :type config_path: str
+    :param base_folder: the base folder of the whole project, defaults to None
+    :type base_folder: str, optional
+    :param snapshot: whether to use the snapshot of the config file, see `Config`, defaults to False
+    :type snapshot: bool, optional
+    :return: the frozen config
+    :rtype: Config
+    """
+    key = _config_cache_key(config_path, base_folder)
+
+    with _CONFIG_CACHE_LOCK:
+        conf = _CONFIG_CACHE.get(key)
+        if conf is not None:
+            _CONFIG_CACHE.move_to_end(key)
+            _CONFIG_CACHE_STATS["hits"] += 1
+            return conf
+        _CONFIG_CACHE_STATS["misses"] += 1
+
+    conf = Config(config_path, base_folder=base_folder, frozen=True, snapshot=snapshot)
+
+    with _CONFIG_CACHE_LOCK:
+        # configs of the previous versions of the file are not used anymore
+        for k in [k for k in _CONFIG_CACHE if k[0] == key[0] and k[2] == key[2]]:
+            del _CONFIG_CACHE[k]
+        _CONFIG_CACHE[key] = conf
+        while len(_CONFIG_CACHE) > CONFIG_CACHE_SIZE:
+            _CONFIG_CACHE.popitem(last=False)
+
+    return conf
+
+
+def invalidate_config_cache(config_path=None, base_folder=None):
+    """
+    invalidate_config_cache removes the configs of the file from the cache of
+    `load_cached_config`. All the configs are removed and the statistics are reset
+    if `config_path` is not specified.
+
+    :param config_path: path to the config file, defaults to None
+    :type config_path: str, optional
+    :param base_folder: the base folder of the whole project, defaults to None
+    :type base_folder: str, optional
+    """
+    with _CONFIG_CACHE_LOCK:
+        if config_path is None:
+            _CONFIG_CACHE.clear()
+            _CONFIG_CACHE_STATS["hits"] = 0
+            _CONFIG_CACHE_STATS["misses"] = 0
+            return
+
+        real_path = os.path.realpath(_resolve_config_path(config_path, base_folder))
+        for k in [k for k in _CONFIG_CACHE if k[0] == real_path]:
+            del _CONFIG_CACHE[k]
+
+
+def config_cache_info():
+    """
+    config_cache_info returns the statistics of the cache of `load_cached_config`.
+
+    ```
+    >>> config_cache_info()
+    {'hits': 120, 'misses': 2, 'maxsize': 32, 'currsize': 2}
+    ```
+
+    :return: hits, misses, maxsize and currsize of the cache
+    :rtype: dict
+    """
+    return {
+        **_CONFIG_CACHE_STATS,
+        "maxsize": CONFIG_CACHE_SIZE,
+        "currsize": len(_CONFIG_CACHE),
+    }
+
+
+def _resolve_config_path(config_path, base_folder=None):
+    """
+    _resolve_config_path joins the base folder and the path, the same as `load_config`.
+    """
+    if config_path is None:
+        raise Exception(f"config_path has not been specified...")
+    if base_folder is not None:
+        config_path = os.path.join(base_folder, config_path)
+
+    return config_path
+
+
+def _config_cache_key(config_path, base_folder=None):
+    """
+    _config_cache_key is the key of the config in the cache of `load_cached_config`.
+    """
+    config_path = _resolve_config_path(config_path, base_folder)
+    try:
+        mtime = os.stat(config_path).st_mtime_ns
+    except FileNotFoundError:
+        raise Exception(
+            f"config file path {config_path} does not exist! Beware of the relative path."
+        )
+
+    return os.path.realpath(config_path), mtime, base_folder
@@ -0,0 +1 @@
+from haferml.data.wrangle import datetime, flatten, misc
@@ -1,9 +1,23 @@
 import datetime
+import functools
+import os
+import threading
+import warnings
+from collections import OrderedDict
 from loguru import logger
 
 import dateutil
+import numpy as np
+import simplejson as json
 import pandas as pd
 
+try:
+    from pandas.tseries.api import guess_datetime_format as _guess_datetime_format
+except ImportError:
+    from pandas._libs.tslibs.parsing import (
+        guess_datetime_format as _guess_datetime_format,
+    )
+
 
 def convert_to_datetime(input_date, dayfirst=None, input_tz=None, output_tz=None):
     """
@@ -43,7 +57,7 @@ def convert_to_datetime(input_date, dayfirst=None, input_tz=None, output_tz=None
             res = res.astimezone(output_tz)
     elif isinstance(input_date, str):
         try:
-            res = dateutil.parser.parse(input_date, dayfirst=dayfirst)
+            res = _parse_datetime_string(input_date, dayfirst)
             if input_tz:
                 res = res.replace(tzinfo=input_tz)
             if output_tz:
@@ -71,6 +85,401 @@ def convert_to_datetime(input_date, dayfirst=None, input_tz=None, output_tz=None
     return res
 
 
+DATETIME_FORMAT_CACHE_SIZE = 256
+
+_DIGITS_TO_ZERO = str.maketrans("123456789", "000000000")
+_FORMAT_CACHE = OrderedDict()
+_FORMAT_CACHE_LOCK = threading.Lock()
+_FORMAT_CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def datetime_format_cache_info():
+    """
+    datetime_format_cache_info returns the statistics of the cache of the learned
+    datetime formats used by `convert_to_datetime`.
+
+    A hit means that the string was parsed by `strptime` using a learned format
+    instead of `dateutil`.
+
+    ```python
+    >>> datetime_format_cache_info()
+    {'hits': 9998, 'misses': 2, 'maxsize': 256, 'currsize': 2}
+    ```
+
+    :return: hits, misses, maxsize and currsize of the cache
+    :rtype: dict
+    """
+    return {
+        **_FORMAT_CACHE_STATS,
+        "maxsize": DATETIME_FORMAT_CACHE_SIZE,
+        "currsize": len(_FORMAT_CACHE),
+    }
+
+
+def clear_datetime_format_cache():
+    """
+    clear_datetime_format_cache removes the learned datetime formats and resets the
+    statistics.
+    """
+    with _FORMAT_CACHE_LOCK:
+        _FORMAT_CACHE.clear()
+        _FORMAT_CACHE_STATS["hits"] = 0
+        _FORMAT_CACHE_STATS["misses"] = 0
+
+
+def _parse_datetime_string(input_date, dayfirst):
+    """
+    _parse_datetime_string parses the string the same way as `dateutil.parser.parse`
+    but tries `strptime` first using the format learned from a previous string of
+    the same shape.
+
+    The shape of a string is the string with all the digits replaced by `0`, so that
+    the length and the positions of the separators are kept. The format of a shape
+    is learned from the first string parsed by `dateutil` and is only cached if
+    `strptime` gives the same result.
+    """
+    key = (input_date.translate(_DIGITS_TO_ZERO), dayfirst)
+    dt_format = _FORMAT_CACHE.get(key)
+    if dt_format:
+        try:
+            res = datetime.datetime.strptime(input_date, dt_format)
+        except ValueError:
+            # e.g., 13/01/2021 for %m/%d/%Y
+            pass
+        else:
+            _FORMAT_CACHE_STATS["hits"] += 1
+            return res
+
+    _FORMAT_CACHE_STATS["misses"] += 1
+    res = dateutil.parser.parse(input_date, dayfirst=dayfirst)
+    if key not in _FORMAT_CACHE:
+        _learn_datetime_format(key, input_date, dayfirst, res)
+
+    return res
+
+
+def _learn_datetime_format(key, input_date, dayfirst, expected):
+    """
+    _learn_datetime_format caches the format of `input_date` if `strptime` using the
+    format gives the `expected` datetime. Otherwise, an empty format is cached so that
+    the shape is not guessed again.
+    """
+    dt_format = _guess_format(input_date, dayfirst)
+    if dt_format is None:
+        dt_format = ""
+    else:
+        try:
+            parsed = datetime.datetime.strptime(input_date, dt_format)
+        except ValueError:
+            # e.g., 13/01/2021 for %m/%d/%Y, the day and month are swapped by dateutil
+            try:
+                parsed = datetime.datetime.strptime(
+                    input_date, _swap_day_month(dt_format)
+                )
+            except ValueError:
+                parsed = None
+        if parsed != expected:
+            dt_format = ""
+
+    with _FORMAT_CACHE_LOCK:
+        _FORMAT_CACHE[key] = dt_format
+        while len(_FORMAT_CACHE) > DATETIME_FORMAT_CACHE_SIZE:
+            _FORMAT_CACHE.popitem(last=False)
+
+
+def _guess_format(input_date, dayfirst):
+    """
+    _guess_format guesses the format of a datetime string that can be used instead
+    of `dateutil`.
+
+    The day and month are put in the order given by `dayfirst` as `dateutil` uses
+    this order if the day and month are ambiguous. Formats with timezones (`%z`,
+    `%Z`), two digit years (`%y`) or without a year, month or day are rejected.
+
+    :return: the format, or None if the format is rejected
+    """
+    with warnings.catch_warnings():
+        # pandas warns if the format does not follow dayfirst
+        warnings.simplefilter("ignore")
+        dt_format = _guess_datetime_format(input_date, dayfirst=dayfirst)
+
+    if (
+        dt_format is None
+        or any(d in dt_format for d in ("%z", "%Z", "%y"))
+        or not all(d in dt_format for d in ("%Y", "%d"))
+        or not any(d in dt_format for d in ("%m", "%b", "%B"))
+    ):
+        return None
+    if "%m" in dt_format and (dt_format.index("%d") < dt_format.index("%m")) != (
+        dayfirst
+    ):
+        dt_format = _swap_day_month(dt_format)
+
+    return dt_format
+
+
+def _swap_day_month(dt_format):
+    """
+    _swap_day_month swaps the `%d` and `%m` directives of the format.
+    """
+    return dt_format.replace("%d", "%_").replace("%m", "%d").replace("%_", "%m")
+
+
+def infer_datetime_format(data, dayfirst=None, sample_size=None):
+    """
+    infer_datetime_format infers the format of the datetime strings from a sample.
+
+    The format is guessed from the first string and accepted only if parsing the
+    sampled strings using the format gives the same results as `dateutil`, which is
+    used by `convert_to_datetime`. Formats with timezones (`%z`, `%Z`), two digit
+    years (`%y`) or without a year, month or day are not accepted. The day and month
+    of the format follow the order given by `dayfirst`, the same as `dateutil` for
+    ambiguous dates.
+
+    :param data: datetime strings
+    :type data: list, pandas.Series or numpy.ndarray
+    :param dayfirst: whether to interpret the first value in an ambiguous date as the day, defaults to True
+    :param sample_size: number of strings to verify the format, defaults to 20
+    :type sample_size: int, optional
+    :return: the format, or None if no format could be inferred
+    :rtype: str
+    """
+    if dayfirst is None:
+        dayfirst = True
+    if sample_size is None:
+        sample_size = 20
+
+    sample = []
+    for val in data:
+        if isinstance(val, str):
+            sample.append(val)
+            if len(sample) >= sample_size:
+                break
+    if not sample:
+        return None
+
+    dt_format = _guess_format(sample[0], dayfirst)
+    if dt_format is None:
+        return None
+
+    n_matched = 0
+    for val in sample:
+        try:
+            parsed = datetime.datetime.strptime(val, dt_format)
+        except ValueError:
+            # values in other formats are parsed by dateutil later
+            continue
+        try:
+            expected = dateutil.parser.parse(val, dayfirst=dayfirst)
+        except (ValueError, OverflowError):
+            return None
+        if parsed != expected:
+            return None
+        n_matched += 1
+
+    return dt_format if n_matched else None
+
+
+def convert_to_datetime_series(
+    data, dayfirst=None, input_tz=None, output_tz=None, sample_size=None
+):
+    """
+    Convert a column to datetime, the vectorized version of `convert_to_datetime`.
+
+    1. Strings are parsed with one `pandas.to_datetime` call using the format inferred from a sample by `infer_datetime_format`. The strings that do not match the format are parsed by `convert_to_datetime`, once for each distinct value.
+    2. Numbers are treated as epoch milliseconds and converted in bulk.
+    3. Datetime values are converted by `convert_to_datetime`.
+
+    The timezones are applied on the whole column: the parsed wall times are in
+    `input_tz` (the timezone in the strings is ignored, the same as
+    `convert_to_datetime`) and converted to `output_tz`. Ambiguous or nonexistent
+    local times are NaT.
+
+    ```python
+    >>> convert_to_datetime_series(pd.Series(["2018-07-11 17:33:32", 1531323212311, None]))
+    0   2018-07-11 17:33:32+00:00
+    1   2018-07-11 15:33:32.311000+00:00
+    2                         NaT
+    dtype: datetime64[ns, UTC]
+    ```
+
+    :param data: input data of any possible format
+    :type data: pandas.Series, list or numpy.ndarray
+    :param dayfirst: whether to interpret the first value in an ambiguous date as the day, defaults to True
+    :param input_tz: input timezone, defaults to utc
+    :param output_tz: output timezone, defaults to utc
+    :param sample_size: number of strings to infer the format, defaults to 20
+    :type sample_size: int, optional
+    :return: converted datetime column, values that can not be converted or are out of the range of `pandas.Timestamp` (e.g., 9999-12-31) are NaT
+    :rtype: pandas.Series
+    """
+    if dayfirst is None:
+        dayfirst = True
+    if input_tz is None:
+        input_tz = datetime.timezone.utc
+    if output_tz is None:
+        output_tz = datetime.timezone.utc
+
+    if not isinstance(data, pd.Series):
+        data = pd.Series(data, dtype=object)
+    index = data.index
+
+    if pd.api.types.is_datetime64_any_dtype(data):
+        res = data
+        if res.dt.tz is not None:
+            res = res.dt.tz_localize(None)
+    elif pd.api.types.is_bool_dtype(data) or pd.api.types.is_numeric_dtype(data):
+        epoch_ms = data.to_numpy(dtype=float, na_value=np.nan)
+        # timestamps out of the range of pandas are NaT
+        epoch_ms[np.abs(epoch_ms) >= pd.Timestamp.max.value // 10**6] = np.nan
+        res = pd.Series(pd.to_datetime(epoch_ms, unit="ms"), index=index)
+    else:
+        values = data.to_numpy(dtype=object)
+        res = pd.Series(pd.NaT, index=index, dtype="datetime64[ns]")
+
+        value_types = np.array([type(v) for v in values], dtype=object)
+        is_str = value_types == str
+        is_number = (
+            (value_types == int) | (value_types == float) | (value_types == bool)
+        )
+        is_other = ~(is_str | is_number) & ~pd.isnull(values)
+
+        unparsed = np.zeros(len(values), dtype=bool)
+        if is_str.any():
+            str_values = values[is_str]
+            dt_format = infer_datetime_format(
+                str_values, dayfirst=dayfirst, sample_size=sample_size
+            )
+            if dt_format is not None:
+                parsed = pd.to_datetime(
+                    pd.Series(str_values), format=dt_format, errors="coerce"
+                ).to_numpy()
+                res[is_str] = parsed
+                unparsed[is_str] = pd.isnull(parsed)
+            else:
+                unparsed = is_str.copy()
+
+        if is_number.any():
+            try:
+                res[is_number] = pd.to_datetime(
+                    values[is_number].astype(float), unit="ms"
+                ).to_numpy()
+            except (OverflowError, ValueError):
+                # out of bounds timestamps are left to convert_to_datetime
+                unparsed = unparsed | is_number
+
+        # values in other formats are converted one distinct value at a time
+        fallback = unparsed | is_other
+        if fallback.any():
+            converted = {}
+            fallback_values = []
+            for val in values[fallback]:
+                key = (type(val), val)
+                if key not in converted:
+                    dt = convert_to_datetime(
+                        val, dayfirst=dayfirst, input_tz=input_tz, output_tz=input_tz
+                    )
+                    converted[key] = None if dt is None else dt.replace(tzinfo=None)
+                fallback_values.append(converted[key])
+            # datetimes out of the range of pandas, e.g., 9999-12-31, are NaT
+            res[fallback] = pd.to_datetime(
+                pd.Series(fallback_values), errors="coerce"
+            ).to_numpy()
+
+    res = res.dt.tz_localize(input_tz, ambiguous="NaT", nonexistent="NaT")
+
+    return res.dt.tz_convert(output_tz)
+
+
+DATE_CACHE_SIZE = 65536
+
+
+def convert_to_date(input_date, dayfirst=None):
+    """
+    Convert input to *date* object.
+
+    The values are converted the same as `convert_to_datetime` and the date of the
+    datetime is returned. Strings are parsed only once for each distinct value
+    and `dayfirst` as the results are cached (`DATE_CACHE_SIZE`).
+
+    ```
+    >>> convert_to_date("2021-01-02 10:00:00", dayfirst=False)
+    datetime.date(2021, 1, 2)
+    >>> convert_to_date(1531323212311)
+    datetime.date(2018, 7, 11)
+    ```
+
+    :param input_date: input data of any possible format
+    :param dayfirst: whether to interpret the first value in an ambiguous date as the day, defaults to True
+    :return: converted date, None if the value can not be converted
+    :rtype: datetime.date
+    """
+    if dayfirst is None:
+        dayfirst = True
+
+    if isinstance(input_date, datetime.datetime):
+        return input_date.date()
+    elif isinstance(input_date, datetime.date):
+        return input_date
+    elif isinstance(input_date, str):
+        return _convert_str_to_date(input_date, dayfirst)
+
+    res = convert_to_datetime(input_date, dayfirst=dayfirst)
+
+    return None if res is None else res.date()
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def _convert_str_to_date(input_date, dayfirst):
+    """
+    _convert_str_to_date is the cached conversion of the strings for `convert_to_date`.
+    """
+    res = convert_to_datetime(input_date, dayfirst=dayfirst)
+
+    return None if res is None else res.date()
+
+
+def convert_to_date_series(data, dayfirst=None):
+    """
+    Convert a column to dates, the vectorized version of `convert_to_date`.
+
+    Datetime and numeric columns are converted in bulk. The other columns are
+    converted by `convert_to_date` once for each distinct value, which is fast for
+    the low cardinality of dates.
+
+    ```python
+    >>> convert_to_date_series(pd.Series(["2021-01-02", "2021-01-02", None]), dayfirst=False)
+    array(['2021-01-02', '2021-01-02', 'NaT'], dtype='datetime64[D]')
+    ```
+
+    :param data: input data of any possible format
+    :type data: pandas.Series, list or numpy.ndarray
+    :param dayfirst: whether to interpret the first value in an ambiguous date as the day, defaults to True
+    :return: converted dates, values that can not be converted are NaT
+    :rtype: numpy.ndarray
+    """
+    if not isinstance(data, pd.Series):
+        data = pd.Series(data, dtype=object)
+
+    if pd.api.types.is_datetime64_any_dtype(data):
+        if data.dt.tz is not None:
+            data = data.dt.tz_localize(None)
+        return data.to_numpy(dtype="datetime64[D]")
+    elif pd.api.types.is_bool_dtype(data) or pd.api.types.is_numeric_dtype(data):
+        return (
+            convert_to_datetime_series(data)
+            .dt.tz_localize(None)
+            .to_numpy(dtype="datetime64[D]")
+        )
+
+    codes, uniques = pd.factorize(data)
+    converted = [convert_to_date(i, dayfirst=dayfirst) for i in uniques.tolist()]
+    # code -1 represents null values, which are at the end of the array
+    converted = np.array(converted + [None], dtype="datetime64[D]")
+
+    return converted[codes]
+
+
 def unpack_datetime(data):
     """
     unpack_datetime converts datetime (string) to a dict of useful date information
@@ -101,28 +510,296 @@ def unpack_datetime(data):
     return res
 
 
-def date_range_has_weekday(dt_start, dt_end):
+def unpack_datetime_series(data):
+    """
+    unpack_datetime_series is the column version of `unpack_datetime`, which converts
+    a datetime or string column to a dataframe of the year, month, day and weekday.
+
+    The columns use compact dtypes: `int16` for the year and `int8` for the others.
+    If some values can not be converted, the nullable `Int16` and `Int8` dtypes are
+    used and the missing values are `<NA>`.
+
+    ```python
+    >>> unpack_datetime_series(pd.Series(["2021-01-02 10:00:00", None]))
+       year  month   day  weekday
+    0  2021      1     2        6
+    1  <NA>   <NA>  <NA>     <NA>
+    ```
+
+    :param data: datetimes or values that can be converted by `convert_to_datetime_series`
+    :type data: pandas.Series, list or numpy.ndarray
+    :return: dataframe with columns year, month, day and weekday (1 for Monday)
+    :rtype: pandas.DataFrame
+    """
+    if not isinstance(data, pd.Series):
+        data = pd.Series(data, dtype=object)
+    if not pd.api.types.is_datetime64_any_dtype(data):
+        data = convert_to_datetime_series(data, dayfirst=False)
+
+    parts = {
+        "year": data.dt.year,
+        "month": data.dt.month,
+        "day": data.dt.day,
+        "weekday": data.dt.weekday + 1,
+    }
+    has_na = data.isna().any()
+    res = {}
+    for name, values in parts.items():
+        dtype = "int16" if name == "year" else "int8"
+        if has_na:
+            dtype = dtype.capitalize()
+        res[name] = values.astype(dtype)
+
+    return pd.DataFrame(res, index=data.index)
+
+
+def date_range_has_weekday(dt_start, dt_end, weekmask=None, holidays=None):
     """
     date_range_has_weekday decides if the given date range contains weekday
 
+    The dates in the range are the same as `pd.date_range(dt_start, dt_end)`, i.e.,
+    the date of `dt_start` and the following days up to the last whole day before
+    `dt_end`. The weekdays are counted using `numpy.busday_count` without creating
+    the dates.
+
     :param dt_start: datetime of the start of date range
     :param dt_end: datetime of the end of date range
+    :param weekmask: days of the week that are weekdays, in the format of `numpy.busday_count`, defaults to `"1111100"` (Monday to Friday)
+    :type weekmask: str or list, optional
+    :param holidays: dates that are not weekdays
+    :type holidays: list, optional
+    :return: whether the range contains a weekday, None if the start or end is not specified
+    :rtype: bool
     """
-    res = []
-
     if pd.isnull(dt_start) or pd.isnull(dt_end):
         logger.warning(f"date start end not specified: {dt_start}, {dt_end}")
         return None
 
-    if isinstance(dt_start, str):
-        dt_start = pd.to_datetime(dt_start)
-    if isinstance(dt_end, str):
-        dt_end = pd.to_datetime(dt_end)
+    dt_start = pd.Timestamp(dt_start)
+    dt_end = pd.Timestamp(dt_end)
+    n_days = (dt_end - dt_start) // pd.Timedelta(days=1)
+    if n_days < 0:
+        return False
 
-    for dt in pd.date_range(dt_start, dt_end):
-        if dt.weekday() < 5:
-            res.append(True)
-        else:
-            res.append(False)
+    begin = np.datetime64(dt_start.tz_localize(None).date(), "D")
+    n_weekdays = np.busday_count(
+        begin,
+        begin + n_days + 1,
+        busdaycal=_busdaycalendar(weekmask, holidays),
+    )
+
+    return bool(n_weekdays > 0)
+
+
+def date_range_has_weekday_series(dt_start, dt_end, weekmask=None, holidays=None):
+    """
+    date_range_has_weekday_series is the column version of `date_range_has_weekday`.
+
+    ```python
+    >>> date_range_has_weekday_series(
+    ...     pd.Series(["2021-01-02", "2021-01-02", None]),
+    ...     pd.Series(["2021-01-03", "2021-01-04", "2021-01-04"]),
+    ... )
+    0    False
+    1     True
+    2     <NA>
+    dtype: boolean
+    ```
+
+    :param dt_start: datetimes of the start of the date ranges
+    :type dt_start: pandas.Series, list or numpy.ndarray
+    :param dt_end: datetimes of the end of the date ranges
+    :type dt_end: pandas.Series, list or numpy.ndarray
+    :param weekmask: days of the week that are weekdays, in the format of `numpy.busday_count`, defaults to `"1111100"` (Monday to Friday)
+    :type weekmask: str or list, optional
+    :param holidays: dates that are not weekdays
+    :type holidays: list, optional
+    :return: whether each range contains a weekday, using the nullable `boolean` dtype if the start or end of some ranges are not specified
+    :rtype: pandas.Series
+    """
+    index = dt_start.index if isinstance(dt_start, pd.Series) else None
+    dt_start = _to_datetime_series(dt_start)
+    dt_end = _to_datetime_series(dt_end)
+    if dt_start.dt.tz is not None:
+        local_start = dt_start.dt.tz_localize(None)
+    else:
+        local_start = dt_start
+
+    null = (dt_start.isna() | dt_end.isna()).to_numpy()
+    n_days = ((dt_end - dt_start) // pd.Timedelta(days=1)).to_numpy(
+        dtype=float, na_value=np.nan
+    )
+    n_days[null] = -1
+    begin = local_start.to_numpy(dtype="datetime64[D]")
+    begin[null] = np.datetime64(0, "D")
+
+    n_weekdays = np.busday_count(
+        begin,
+        begin + n_days.astype(np.int64) + 1,
+        busdaycal=_busdaycalendar(weekmask, holidays),
+    )
+    res = pd.Series(n_weekdays > 0, index=index)
+    if null.any():
+        res = res.astype("boolean")
+        res[null] = pd.NA
+
+    return res
+
+
+def calendar_table(start, end, weekmask=None, holidays=None, path=None):
+    """
+    calendar_table builds the calendar dimension table of the dates from `start` to
+    `end` (inclusive), indexed by the date.
+
+    The columns are `year`, `month`, `day`, `weekday` (1 for Monday), `day_of_year`,
+    `week` (ISO week), `quarter`, `is_weekend`, `is_holiday` and `is_business_day`.
+    The weekend is the days not in `weekmask` and the business days are the days in
+    `weekmask` that are not holidays.
+
+    If `path` is specified, the table is cached as a parquet file and only rebuilt
+    if it was built for a different range, `weekmask` or `holidays`.
+
+    !!! note
+        Caching the table requires `pyarrow`, e.g., `pip install "haferml[arrow]"`.
+
+    ```python
+    calendar = calendar_table("2010-01-01", "2030-12-31", path="calendar.parquet")
+    features = calendar_features(dataframe.created_at, calendar)
+    ```
+
+    :param start: first date of the calendar
+    :param end: last date of the calendar
+    :param weekmask: days of the week that are weekdays, in the format of `numpy.busday_count`, defaults to `"1111100"` (Monday to Friday)
+    :type weekmask: str or list, optional
+    :param holidays: dates that are not business days
+    :type holidays: list, optional
+    :param path: path of the parquet file to cache the table
+    :type path: str, optional
+    :return: the calendar table
+    :rtype: pandas.DataFrame
+    """
+    busdaycal = _busdaycalendar(weekmask, holidays)
+    start = np.datetime64(pd.Timestamp(start).date(), "D")
+    end = np.datetime64(pd.Timestamp(end).date(), "D")
+    params = json.dumps(
+        {
+            "start": str(start),
+            "end": str(end),
+            "weekmask": "".join(str(int(i)) for i in busdaycal.weekmask),
+            "holidays": [str(i) for i in busdaycal.holidays],
+        }
+    )
+
+    if path is not None and os.path.exists(path):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path)
+        if (table.schema.metadata or {}).get(b"haferml.calendar") == params.encode():
+            return table.to_pandas()
+        logger.info(f"Rebuilding calendar table {path} for {params}")
+
+    dates = np.arange(start, end + 1, dtype="datetime64[D]")
+    index = pd.DatetimeIndex(dates.astype("datetime64[ns]"), name="date")
+    is_weekend = ~np.is_busday(dates, weekmask=busdaycal.weekmask)
+    is_business_day = np.is_busday(dates, busdaycal=busdaycal)
+    res = pd.DataFrame(
+        {
+            "year": index.year.astype("int16"),
+            "month": index.month.astype("int8"),
+            "day": index.day.astype("int8"),
+            "weekday": (index.weekday + 1).astype("int8"),
+            "day_of_year": index.dayofyear.astype("int16"),
+            "week": index.isocalendar().week.to_numpy().astype("int8"),
+            "quarter": index.quarter.astype("int8"),
+            "is_weekend": is_weekend,
+            "is_holiday": np.isin(dates, busdaycal.holidays),
+            "is_business_day": is_business_day,
+        },
+        index=index,
+    )
+
+    if path is not None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(res)
+        table = table.replace_schema_metadata(
+            {**table.schema.metadata, b"haferml.calendar": params.encode()}
+        )
+        pq.write_table(table, path)
+
+    return res
+
+
+def calendar_features(data, calendar):
+    """
+    calendar_features looks up the calendar attributes of the dates in the calendar
+    table built by `calendar_table`.
+
+    The dates are converted to integer offsets from the first date of the calendar
+    and the attributes are taken at the offsets, so the time of the lookup does not
+    depend on the number of attributes to derive.
+
+    Dates that are missing or not in the calendar get missing values, in which case
+    the nullable dtypes (e.g., `Int16`, `boolean`) are used.
+
+    :param data: datetimes or date strings
+    :type data: pandas.Series, list or numpy.ndarray
+    :param calendar: calendar table from `calendar_table`
+    :type calendar: pandas.DataFrame
+    :return: the calendar attributes of each date
+    :rtype: pandas.DataFrame
+    """
+    index = data.index if isinstance(data, pd.Series) else None
+    data = _to_datetime_series(data)
+    if data.dt.tz is not None:
+        data = data.dt.tz_localize(None)
+
+    dates = data.to_numpy(dtype="datetime64[D]")
+    start = calendar.index[0].to_datetime64().astype("datetime64[D]")
+    offsets = (dates - start).astype(np.int64)
+    missing = np.isnat(dates) | (offsets < 0) | (offsets >= len(calendar))
+    if missing.any():
+        offsets[missing] = 0
+
+    res = {}
+    for col in calendar.columns:
+        values = calendar[col].to_numpy().take(offsets)
+        if missing.any():
+            dtype = (
+                "boolean" if values.dtype == bool else values.dtype.name.capitalize()
+            )
+            values = pd.array(values, dtype=dtype)
+            values[missing] = pd.NA
+        res[col] = values
+
+    return pd.DataFrame(res, index=index)
+
+
+def _to_datetime_series(data):
+    """
+    _to_datetime_series converts the data to a datetime series with a range index.
+
+    Columns that are not datetime64 are converted by `convert_to_datetime_series`,
+    which keeps the wall time of the strings.
+    """
+    if not isinstance(data, pd.Series):
+        data = pd.Series(data, dtype=object)
+    if not pd.api.types.is_datetime64_any_dtype(data):
+        data = convert_to_datetime_series(data, dayfirst=False)
+
+    return data.reset_index(drop=True)
+
+
+def _busdaycalendar(weekmask=None, holidays=None):
+    """
+    _busdaycalendar creates the `numpy.busdaycalendar` of the weekdays.
+    """
+    if weekmask is None:
+        weekmask = "1111100"
+    if holidays is None:
+        holidays = []
+    else:
+        holidays = pd.to_datetime(list(holidays)).to_numpy(dtype="datetime64[D]")
 
-    return True in res
+    return np.busdaycalendar(weekmask=weekmask, holidays=holidays)
@@ -0,0 +1,240 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from haferml.data.wrangle.misc import DictPathExtractor, iter_paths_in_dict
+
+
+class Flattener:
+    """
+    Flattener flattens nested records, e.g., JSON events, into columns.
+
+    The paths of the columns are learned from a sample of the records using `fit`,
+    which is the union of the paths to the leaves of the records in the sample. The
+    records are then streamed into preallocated column arrays using a compiled
+    `DictPathExtractor`, so that no intermediate dictionaries are created for each
+    record.
+
+    ```python
+    flattener = Flattener().fit(records[:1000])
+    dataframe = flattener.transform(records)
+    ```
+
+    The columns are named by joining the keys of the paths using `sep`, e.g.,
+    `user.address.city`. Paths that are not in the sample are not flattened;
+    specify `paths` to flatten a fixed set of paths instead of learning them. An
+    exception is raised if two paths have the same column name, e.g., `("a.b",)` and
+    `("a", "b")`; use a different `sep` for such records.
+
+    :param paths: paths of the columns, defaults to None (learned by `fit`)
+    :type paths: list, optional
+    :param sep: separator of the keys in the column names, defaults to "."
+    :type sep: str, optional
+    :param max_depth: maximum length of the paths, deeper dictionaries and lists are kept as values, defaults to None (no limit)
+    :type max_depth: int, optional
+    :param include_lists: whether to flatten the values in lists using the indices, defaults to False
+    :type include_lists: bool, optional
+    :param batch_size: number of rows allocated at once if the number of records is unknown, defaults to 100000
+    :type batch_size: int, optional
+    """
+
+    def __init__(
+        self, paths=None, sep=None, max_depth=None, include_lists=None, batch_size=None
+    ):
+        if sep is None:
+            sep = "."
+        if include_lists is None:
+            include_lists = False
+        if batch_size is None:
+            batch_size = 100000
+
+        self.sep = sep
+        self.max_depth = max_depth
+        self.include_lists = include_lists
+        self.batch_size = batch_size
+        self.paths = None
+        if paths is not None:
+            self._set_paths([tuple(p) for p in paths])
+
+    def fit(self, records, sample_size=None):
+        """
+        fit learns the paths of the columns from the records.
+
+        :param records: iterable of nested records (dict)
+        :param sample_size: number of records to learn the paths from, defaults to 1000
+        :type sample_size: int, optional
+        :return: the flattener itself
+        :rtype: Flattener
+        """
+        if sample_size is None:
+            sample_size = 1000
+
+        paths = {}
+        for record in itertools.islice(records, sample_size):
+            for path in iter_paths_in_dict(
+                record, max_depth=self.max_depth, include_lists=self.include_lists
+            ):
+                paths.setdefault(path, None)
+        if () in paths:
+            # records that are not dictionaries
+            del paths[()]
+
+        self._set_paths(list(paths))
+
+        return self
+
+    @property
+    def columns(self):
+        """
+        columns are the names of the columns of the paths.
+        """
+        return [self.sep.join(str(k) for k in p) for p in self.paths]
+
+    def transform(self, records):
+        """
+        transform flattens the records into a dataframe.
+
+        The dtypes of the columns are inferred from the values, the same as
+        `pandas.DataFrame(records)`.
+
+        :param records: iterable of nested records (dict)
+        :return: the flattened records
+        :rtype: pandas.DataFrame
+        """
+        data = self._transform_to_arrays(records)
+        res = pd.DataFrame(
+            {
+                col: pd.Series(values).infer_objects()
+                for col, values in zip(self.columns, data.values())
+            },
+            columns=self.columns,
+        )
+
+        return res
+
+    def transform_to_arrow(self, records):
+        """
+        transform_to_arrow flattens the records into an arrow table.
+
+        Columns with values of mixed types that can not be converted by `pyarrow` are
+        converted to strings.
+
+        !!! note
+            This method requires `pyarrow`, e.g., `pip install "haferml[arrow]"`.
+
+        :param records: iterable of nested records (dict)
+        :return: the flattened records
+        :rtype: pyarrow.Table
+        """
+        import pyarrow as pa
+
+        data = self._transform_to_arrays(records)
+        arrays = []
+        for col, values in zip(self.columns, data.values()):
+            try:
+                arrays.append(pa.array(values, from_pandas=True))
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                logger.warning(f"Converting column {col} to strings: {e}")
+                arrays.append(pa.array([None if v is None else str(v) for v in values]))
+
+        return pa.Table.from_arrays(arrays, names=self.columns)
+
+    def _set_paths(self, paths):
+        """
+        _set_paths compiles the extractor of the paths.
+
+        The column names of the paths should be unique.
+        """
+        names = {}
+        for path in paths:
+            name = self.sep.join(str(k) for k in path)
+            if name in names:
+                raise Exception(
+                    f"Paths {names[name]} and {path} have the same column name {name}, "
+                    "please use a different sep"
+                )
+            names[name] = path
+
+        self.paths = paths
+        self._extractor = DictPathExtractor(paths, convert_keys=False)
+
+    def _transform_to_arrays(self, records):
+        """
+        _transform_to_arrays fills the object arrays of the columns with the values of
+        the records.
+
+        The arrays are allocated once if the number of records is known, otherwise
+        they are allocated in batches and concatenated.
+
+        :return: dictionary of the paths and the arrays
+        :rtype: dict
+        """
+        if self.paths is None:
+            raise Exception("The paths are unknown, please fit the flattener first")
+
+        n_columns = len(self.paths)
+        if hasattr(records, "__len__"):
+            columns = [
+                np.full(len(records), None, dtype=object) for _ in range(n_columns)
+            ]
+            self._extractor.extract_to_columns(records, columns)
+        else:
+            records = iter(records)
+            batches = []
+            while True:
+                batch = [
+                    np.full(self.batch_size, None, dtype=object)
+                    for _ in range(n_columns)
+                ]
+                n_rows = self._extractor.extract_to_columns(
+                    itertools.islice(records, self.batch_size), batch
+                )
+                batches.append([values[:n_rows] for values in batch])
+                if n_rows < self.batch_size:
+                    break
+            columns = [
+                np.concatenate([batch[i] for batch in batches])
+                for i in range(n_columns)
+            ]
+
+        return dict(zip(self.paths, columns))
+
+
+def flatten_records(records, sample_size=None, sep=None, max_depth=None):
+    """
+    flatten_records flattens nested records into a dataframe using a `Flattener`
+    fitted on the first `sample_size` records.
+
+    ```python
+    >>> flatten_records([{"user": {"id": 1, "name": "a"}}, {"user": {"id": 2}}])
+       user.id user.name
+    0        1         a
+    1        2      None
+    ```
+
+    :param records: iterable of nested records (dict)
+    :param sample_size: number of records to learn the paths from, defaults to 1000
+    :type sample_size: int, optional
+    :param sep: separator of the keys in the column names, defaults to "."
+    :type sep: str, optional
+    :param max_depth: maximum length of the paths, defaults to None (no limit)
+    :type max_depth: int, optional
+    :return: the flattened records
+    :rtype: pandas.DataFrame
+    """
+    if sample_size is None:
+        sample_size = 1000
+
+    flattener = Flattener(sep=sep, max_depth=max_depth)
+    if hasattr(records, "__len__"):
+        flattener.fit(records, sample_size=sample_size)
+    else:
+        # the sample is kept to be flattened with the rest of the records
+        records = iter(records)
+        sample = list(itertools.islice(records, sample_size))
+        flattener.fit(sample, sample_size=sample_size)
+        records = itertools.chain(sample, records)
+
+    return flattener.transform(records)
@@ -1,5 +1,7 @@
 from ast import literal_eval
 
+import numpy as np
+import pandas as pd
 from loguru import logger
 
 
@@ -63,6 +65,156 @@ def get_value_in_dict_recursively(dictionary, path, ignore_path_fail=None):
             return None
 
 
+class DictPathExtractor:
+    """
+    DictPathExtractor extracts the values of many paths from nested dictionaries.
+
+    The paths are compiled into a trie once, so that the shared prefixes of the paths
+    are only looked up once for each record. The keys are converted to int if
+    possible, the same as `get_value_in_dict_recursively`, so that the values in
+    lists can be extracted using the indices.
+
+    ```python
+    >>> extractor = DictPathExtractor([["user", "id"], ["user", "name"], ["items", 0, "sku"]])
+    >>> extractor.extract({"user": {"id": 1, "name": "a"}, "items": [{"sku": "x"}]})
+    [1, 'a', 'x']
+    >>> extractor.extract_many([{"user": {"id": 2}}])
+    [[2, None, None]]
+    ```
+
+    Unlike `get_value_in_dict_recursively`, the paths that can not be found are not
+    logged.
+
+    :param paths: paths to the values to be extracted
+    :type paths: list
+    :param convert_keys: whether to convert the keys to int if possible, defaults to True
+    :type convert_keys: bool, optional
+    """
+
+    def __init__(self, paths, convert_keys=None):
+        if convert_keys is None:
+            convert_keys = True
+        self.paths = [list(p) for p in paths]
+        path_key = _path_key if convert_keys else _keep_key
+
+        trie = {}
+        for slot, path in enumerate(self.paths):
+            if not path:
+                # get_value_in_dict_recursively returns None for empty paths
+                continue
+            node = trie
+            for key in path[:-1]:
+                node = node.setdefault(path_key(key), [[], {}])[1]
+            node.setdefault(path_key(path[-1]), [[], {}])[0].append(slot)
+
+        self._trie = _compile_trie(trie)
+
+    def extract(self, record):
+        """
+        extract extracts the values of the paths from the record.
+
+        :param record: the nested dictionary
+        :type record: dict
+        :return: values of the paths in the same order as the paths, None for the paths that can not be found
+        :rtype: list
+        """
+        res = [None] * len(self.paths)
+        stack = [(record, self._trie)]
+        while stack:
+            data, children = stack.pop()
+            for key, slots, sub_children in children:
+                try:
+                    value = data[key]
+                except (KeyError, IndexError, TypeError):
+                    continue
+                for slot in slots:
+                    res[slot] = value
+                if sub_children:
+                    stack.append((value, sub_children))
+
+        return res
+
+    def extract_many(self, records):
+        """
+        extract_many extracts the values of the paths from each of the records.
+
+        :param records: iterable of nested dictionaries
+        :return: values of the paths of each record
+        :rtype: list
+        """
+        extract = self.extract
+
+        return [extract(record) for record in records]
+
+    def extract_to_columns(self, records, columns, start=None):
+        """
+        extract_to_columns writes the values of the paths of each record to the
+        preallocated columns, without creating the rows.
+
+        The values of the i-th path of the n-th record are written to
+        `columns[i][start + n]`. The cells of the paths that can not be found are not
+        written to.
+
+        :param records: iterable of nested dictionaries
+        :param columns: one preallocated array for each path, e.g., `numpy.empty(n, dtype=object)`
+        :type columns: list
+        :param start: the position in the columns of the first record, defaults to 0
+        :type start: int, optional
+        :return: the number of records
+        :rtype: int
+        """
+        if start is None:
+            start = 0
+
+        trie = self._trie
+        row = start
+        for record in records:
+            stack = [(record, trie)]
+            while stack:
+                data, children = stack.pop()
+                for key, slots, sub_children in children:
+                    try:
+                        value = data[key]
+                    except (KeyError, IndexError, TypeError):
+                        continue
+                    for slot in slots:
+                        columns[slot][row] = value
+                    if sub_children:
+                        stack.append((value, sub_children))
+            row += 1
+
+        return row - start
+
+
+def _path_key(key):
+    """
+    _path_key converts the key to int if possible, the same as
+    `get_value_in_dict_recursively`.
+    """
+    try:
+        return int(key)
+    except (ValueError, TypeError):
+        return key
+
+
+def _keep_key(key):
+    """
+    _keep_key keeps the key as it is.
+    """
+    return key
+
+
+def _compile_trie(trie):
+    """
+    _compile_trie converts the trie of dictionaries to tuples of
+    `(key, slots, children)` for faster traversal.
+    """
+    return tuple(
+        (key, tuple(slots), _compile_trie(children))
+        for key, (slots, children) in trie.items()
+    )
+
+
 def update_dict_recursively(dictionary, key_path, value):
     """
     update or insert values to a dictionary recursively.
@@ -130,13 +282,67 @@ def get_all_paths_in_dict(dic, path=None):
     """
     if path is None:
         path = []
-    if not isinstance(dic, dict):
-        return [path]
-    else:
-        ret = []
-        for k, v in dic.items():
-            ret.extend(get_all_paths_in_dict(v, path + [k]))
-        return ret
+
+    return [[*path, *p] for p in iter_paths_in_dict(dic, include_lists=False)]
+
+
+def iter_paths_in_dict(dic, max_depth=None, key_filter=None, include_lists=None):
+    """
+    Iterate through all the paths to the leaves in a nested dictionary.
+
+    The paths are generated lazily as tuples in the same order as
+    `get_all_paths_in_dict`. The values in lists are also visited using the indices
+    of the list unless `include_lists=False`. Empty dictionaries and lists are not
+    leaves.
+
+    ```
+    >>> list(iter_paths_in_dict({"etl": {"local": "abc", "files": ["a", "b"]}}))
+    [('etl', 'local'), ('etl', 'files', 0), ('etl', 'files', 1)]
+    >>> list(iter_paths_in_dict({"etl": {"local": "abc", "files": ["a", "b"]}}, max_depth=1))
+    [('etl',)]
+    ```
+
+    :param dic: dictionary to be get data from
+    :type dic: dict
+    :param max_depth: maximum length of the paths, the dictionaries and lists at this depth are treated as leaves, defaults to None (no limit)
+    :type max_depth: int, optional
+    :param key_filter: function of the key that returns whether to visit the key of a dictionary, defaults to None (all keys)
+    :type key_filter: callable, optional
+    :param include_lists: whether to visit the values in lists, defaults to True
+    :type include_lists: bool, optional
+    :return: generator of the paths
+    """
+    if include_lists is None:
+        include_lists = True
+    container_types = (dict, list) if include_lists else dict
+
+    def children(node):
+        if not isinstance(node, dict):
+            return enumerate(node)
+        if key_filter is None:
+            return iter(node.items())
+        return ((k, v) for k, v in node.items() if key_filter(k))
+
+    if not isinstance(dic, container_types) or max_depth == 0:
+        yield ()
+        return
+
+    # a stack of the iterators of the children, so that the paths are generated in
+    # order without materializing the children
+    stack = [((), children(dic))]
+    while stack:
+        path, items = stack[-1]
+        for k, v in items:
+            k_path = path + (k,)
+            if not isinstance(v, container_types):
+                yield k_path
+            elif max_depth is not None and len(k_path) >= max_depth:
+                yield k_path
+            else:
+                stack.append((k_path, children(v)))
+                break
+        else:
+            stack.pop()
 
 
 ###############
@@ -240,3 +446,140 @@ def eu_float_string_to_float(data):
         raise TypeError("Input data should be string")
 
     return res
+
+
+def detect_decimal_convention(data, sample_size=None):
+    """
+    detect_decimal_convention detects whether the numeric strings use the EU
+    (`1.234,5`) or US (`1,234.5`) decimal convention from a sample of the values.
+
+    Each value in the sample votes based on the separators:
+
+    1. with both separators, the last one is the decimal separator;
+    2. with repeated separators, the repeated one is the thousands separator;
+    3. with a single separator not followed by exactly three digits, the separator is the decimal separator.
+
+    Other values, e.g., `1.234`, are ambiguous and do not vote. The EU convention is
+    returned if there is a tie, the same as `eu_float_string_to_float`.
+
+    :param data: values of the column
+    :type data: pandas.Series, list or numpy.ndarray
+    :param sample_size: number of values used to detect the convention, defaults to 1000
+    :type sample_size: int, optional
+    :return: "eu" or "us"
+    :rtype: str
+    """
+    if sample_size is None:
+        sample_size = 1000
+
+    eu_votes = 0
+    us_votes = 0
+    n_sampled = 0
+    for val in data:
+        if n_sampled >= sample_size:
+            break
+        if not isinstance(val, str):
+            continue
+        val = val.strip()
+        n_dots = val.count(".")
+        n_commas = val.count(",")
+        if not n_dots and not n_commas:
+            continue
+        n_sampled += 1
+
+        if n_dots and n_commas:
+            if val.rfind(",") > val.rfind("."):
+                eu_votes += 1
+            else:
+                us_votes += 1
+        elif n_dots > 1:
+            eu_votes += 1
+        elif n_commas > 1:
+            us_votes += 1
+        elif n_commas and len(val) - val.rfind(",") - 1 != 3:
+            eu_votes += 1
+        elif n_dots and len(val) - val.rfind(".") - 1 != 3:
+            us_votes += 1
+
+    return "us" if us_votes > eu_votes else "eu"
+
+
+def float_string_series_to_float(data, convention=None, sample_size=None):
+    """
+    float_string_series_to_float converts a column of numeric strings to floats
+    using vectorized string operations.
+
+    The thousands separators are removed and the decimal separator is converted to
+    `.` before the column is parsed by `pandas.to_numeric`. Values that are not
+    strings, e.g., ints and floats, are converted to floats as they are.
+
+    Instead of raising exceptions, the cells that can not be converted are flagged
+    in a mask and set to NaN.
+
+    ```python
+    >>> values, bad = float_string_series_to_float(pd.Series(["1.234,5", "2,5", "abc", None]))
+    >>> values.tolist()
+    [1234.5, 2.5, nan, nan]
+    >>> bad
+    array([False, False,  True, False])
+    ```
+
+    :param data: values of the column
+    :type data: pandas.Series, list or numpy.ndarray
+    :param convention: "eu" for `1.234,5`, "us" for `1,234.5`, or None to detect the convention using `detect_decimal_convention`
+    :type convention: str, optional
+    :param sample_size: number of values used to detect the convention, defaults to 1000
+    :type sample_size: int, optional
+    :return: the converted floats and the mask of the non-null cells that could not be converted
+    :rtype: tuple
+    """
+    if not isinstance(data, pd.Series):
+        data = pd.Series(data, dtype=object)
+    if convention is None:
+        convention = detect_decimal_convention(data, sample_size=sample_size)
+    if convention not in ("eu", "us"):
+        raise ValueError(f"convention should be eu or us: {convention}")
+
+    null = pd.isnull(data).to_numpy()
+    if pd.api.types.is_bool_dtype(data) or pd.api.types.is_numeric_dtype(data):
+        values = data.to_numpy(dtype=float, na_value=np.nan)
+    elif data.dtype == object:
+        # the str methods of object columns loop in python anyway, so the strings
+        # are converted in a single pass
+        if convention == "eu":
+            converted = [
+                v.replace(".", "").replace(",", ".") if isinstance(v, str) else v
+                for v in data.tolist()
+            ]
+        else:
+            converted = [
+                v.replace(",", "") if isinstance(v, str) else v for v in data.tolist()
+            ]
+        values = _to_float_array(converted)
+    elif pd.api.types.is_string_dtype(data):
+        if convention == "eu":
+            converted = data.str.replace(".", "", regex=False).str.replace(
+                ",", ".", regex=False
+            )
+        else:
+            converted = data.str.replace(",", "", regex=False)
+        values = _to_float_array(converted.astype(object).tolist())
+    else:
+        values = np.full(len(data), np.nan)
+
+    bad = np.isnan(values) & ~null
+
+    return pd.Series(values, index=data.index), bad
+
+
+def _to_float_array(values):
+    """
+    _to_float_array converts a list of values to a float array, invalid values are NaN.
+    """
+    try:
+        # much faster than pandas.to_numeric if all the values are valid
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(
+            dtype=float, na_value=np.nan
+        )
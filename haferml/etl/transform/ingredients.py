@@ -0,0 +1,184 @@
+import atexit
+import weakref
+
+import simplejson as json
+from loguru import logger
+
+# collectors with quarantine files, flushed when the interpreter exits
+_QUARANTINE_COLLECTORS = weakref.WeakSet()
+
+
+class ErrorCollector:
+    """
+    ErrorCollector collects the failed transformations of a `Transformer`.
+
+    The failures are counted per column. Only a sample of the failures is logged,
+    i.e., the first `log_first` failures of each column and every `log_every`-th
+    failure after that, so that a dirty feed does not flood the logs.
+
+    If `quarantine_path` is specified, the raw records that failed are appended to
+    the file as JSON lines. The records are buffered and written every `buffer_size`
+    records or when `flush` is called. The batch methods of `Transformer` flush at the
+    end; the remaining records of `Transformer.transform` are written when the
+    collector is closed, i.e., `close`, the end of a `with` block, when the collector
+    is garbage collected or when the interpreter exits.
+
+    ```python
+    errors = ErrorCollector(quarantine_path="quarantine.jsonl")
+    transformer = Transformer(schema, error_collector=errors)
+    for batch in transformer.transform_stream(records):
+        ...
+
+    errors.summary()
+    # {'total': 3, 'columns': {'price': 2, 'count': 1}}
+    ```
+
+    ```python
+    with ErrorCollector(quarantine_path="quarantine.jsonl") as errors:
+        transformer = Transformer(schema, error_collector=errors)
+        for record in records:
+            transformer.transform(record)
+    ```
+
+    :param quarantine_path: path to the JSONL file for the failed records, defaults to None
+    :type quarantine_path: str, optional
+    :param log_first: number of failures to log for each column, defaults to 10
+    :type log_first: int, optional
+    :param log_every: log every `log_every`-th failure of each column after the first ones, defaults to 10000
+    :type log_every: int, optional
+    :param buffer_size: number of failed records to buffer before writing, defaults to 1000
+    :type buffer_size: int, optional
+    """
+
+    def __init__(
+        self, quarantine_path=None, log_first=None, log_every=None, buffer_size=None
+    ):
+        if log_first is None:
+            log_first = 10
+        if log_every is None:
+            log_every = 10000
+        if buffer_size is None:
+            buffer_size = 1000
+
+        self.quarantine_path = quarantine_path
+        self.log_first = log_first
+        self.log_every = log_every
+        self.buffer_size = buffer_size
+        # set to False to keep the failed records in the buffer, e.g., in worker processes
+        self.autoflush = True
+
+        self.counts = {}
+        self.rows = []
+
+        if quarantine_path is not None:
+            _QUARANTINE_COLLECTORS.add(self)
+
+    def add(self, column, value, error):
+        """
+        add records one failed transformation of a value in column `column`.
+
+        :param column: name of the column
+        :param value: the raw value that failed
+        :param error: the exception raised by the transformer
+        """
+        count = self.counts.get(column, 0) + 1
+        self.counts[column] = count
+
+        if count <= self.log_first or count % self.log_every == 0:
+            logger.error(
+                f"Failed to transform column {column} (failure #{count}): "
+                f"value {value!r}; e {error}"
+            )
+
+    def quarantine(self, record):
+        """
+        quarantine keeps the raw record that failed to be written to the quarantine file.
+
+        :param record: the raw record
+        :type record: dict
+        """
+        if self.quarantine_path is None:
+            return
+
+        self.rows.append(record)
+        if self.autoflush and len(self.rows) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        flush writes the buffered failed records to the quarantine file.
+
+        NaN and infinite floats in the records are written as null.
+        """
+        if self.quarantine_path is None or not self.rows:
+            return
+
+        # the buffer is swapped first so that a failure can not write the rows twice
+        rows, self.rows = self.rows, []
+        with open(self.quarantine_path, "a") as fp:
+            for row in rows:
+                # NaN and infinity are not valid JSON and are written as null
+                fp.write(json.dumps(row, default=str, ignore_nan=True) + "\n")
+
+    def close(self):
+        """
+        close writes the buffered failed records to the quarantine file.
+
+        The records are kept in the buffer if `autoflush` is False, e.g., in the
+        worker processes, where they are sent back to the main process.
+        """
+        if self.autoflush:
+            self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def merge(self, counts, rows=None):
+        """
+        merge adds the failures collected somewhere else, e.g., in a worker process.
+
+        :param counts: number of failures of each column
+        :type counts: dict
+        :param rows: failed records, defaults to None
+        :type rows: list, optional
+        """
+        for column, count in counts.items():
+            self.counts[column] = self.counts.get(column, 0) + count
+
+        for row in rows or []:
+            self.quarantine(row)
+
+    def reset(self):
+        """
+        reset clears the counts and the buffered records.
+        """
+        self.counts = {}
+        self.rows = []
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def summary(self):
+        """
+        summary returns the total number of failures and the failures of each column.
+
+        :rtype: dict
+        """
+        return {"total": self.total, "columns": dict(self.counts)}
+
+
+@atexit.register
+def _close_quarantine_collectors():
+    """
+    _close_quarantine_collectors writes the buffered failed records of the
+    collectors that are still alive when the interpreter exits.
+    """
+    for collector in list(_QUARANTINE_COLLECTORS):
+        collector.close()
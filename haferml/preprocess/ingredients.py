@@ -1,6 +1,6 @@
 import inspect
 import time
-from functools import wraps
+from functools import lru_cache, wraps
 
 from loguru import logger
 
@@ -140,23 +140,9 @@ def with_transforms(attr=None):
         attr = "order"
 
     def _with_transforms(f):
+        @wraps(f)
         def _get_transforms(self, *args):
-            all_methods = dict(inspect.getmembers(self))
-            transforms = []
-
-            for method_name, method_func in all_methods.items():
-                if hasattr(method_func, attr):
-                    method_order = getattr(method_func, attr)
-                    logger.debug(f"{method_name} has order {method_order}")
-
-                    transforms.append(
-                        {"name": method_name, "method": method_func, attr: method_order}
-                    )
-            transforms = sorted(transforms, key=lambda k: k[attr])
-            self.transforms = {m["name"]: m["method"] for m in transforms}
-
-            logger.debug("All methods: {}".format(all_methods))
-            logger.debug("Ordered predefined transformers: {}".format(self.transforms))
+            self.transforms = _bind_transforms(self, attr)
 
             return f(self, *args)
 
@@ -165,6 +151,49 @@ def with_transforms(attr=None):
     return _with_transforms
 
 
+@lru_cache(maxsize=1024)
+def _get_transform_names(cls, attr):
+    """
+    _get_transform_names finds the names of the methods of the class that have the
+    attribute `attr`, ordered by the attribute and then the names.
+
+    The methods are looked up on the class instead of the instances so that the
+    properties are not evaluated, and the names are cached per class and
+    attribute. Methods that are added to the class after the first lookup are
+    therefore not found.
+
+    :param cls: the class of the transforms
+    :type cls: type
+    :param attr: name of the attribute that orders the methods
+    :type attr: str
+    :return: the ordered names of the methods
+    :rtype: tuple
+    """
+    transforms = []
+    for method_name, method_func in inspect.getmembers(cls):
+        if hasattr(method_func, attr):
+            transforms.append((getattr(method_func, attr), method_name))
+    transforms = sorted(transforms, key=lambda k: k[0])
+
+    names = tuple(name for _, name in transforms)
+    logger.debug(f"Ordered predefined transformers of {cls.__name__}: {names}")
+
+    return names
+
+
+def _bind_transforms(obj, attr):
+    """
+    _bind_transforms binds the ordered transforms of the class of `obj` to `obj`.
+
+    :param obj: the instance
+    :param attr: name of the attribute that orders the methods
+    :type attr: str
+    :return: dictionary of the names and the bound methods
+    :rtype: dict
+    """
+    return {name: getattr(obj, name) for name in _get_transform_names(type(obj), attr)}
+
+
 class OrderedProcessor:
     """
     Go through an ordered methods in OrderedProcessor to transform a dataframe.
@@ -189,26 +218,20 @@ class OrderedProcessor:
         self.current_timestamp = int(time.time())
         logger.info(f"current timestamp: {self.current_timestamp}")
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # order the transforms once when the class is created
+        _get_transform_names(cls, "order")
+
     def _get_transforms(self):
         """
         _get_transforms extracts the list of transformers.
 
+        The ordered names of the transformers are found once per class and the
+        methods are bound to the instance.
+
         This method can be replaced by the decorator `with_transforms`.
         """
 
-        all_methods = dict(inspect.getmembers(self))
-        transforms = []
-
-        for method_name, method_func in all_methods.items():
-            if hasattr(method_func, "order"):
-                method_order = method_func.order
-                logger.info(f"{method_name} has order {method_order}")
-
-                transforms.append(
-                    {"name": method_name, "method": method_func, "order": method_order}
-                )
-        transforms = sorted(transforms, key=lambda k: k["order"])
-        self.transforms = {m["name"]: m["method"] for m in transforms}
-
-        logger.debug("All methods: {}".format(all_methods))
-        logger.info("Ordered predefined transformers: {}".format(self.transforms))
+        self.transforms = _bind_transforms(self, "order")
+        logger.info(f"Ordered predefined transformers: {list(self.transforms)}")
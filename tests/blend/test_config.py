@@ -1,5 +1,16 @@
+import operator
+import os
+import tempfile
+
+import simplejson as json
 from nose import tools as _tools
-from haferml.blend.config import Config
+from haferml.blend.config import (
+    Config,
+    ConfigView,
+    config_cache_info,
+    invalidate_config_cache,
+    load_cached_config,
+)
 
 
 def test_Config_with_base_folder():
@@ -162,3 +173,132 @@ def test_Config_without_base_folder_getitem():
             "remote": "",
         },
     )
+
+
+def test_Config_set():
+
+    test_config = {
+        "etl": {
+            "raw": {
+                "transactions": {"local": "abc", "name": "def.parquet", "remote": ""},
+                "stations": [{"local": "abc"}],
+            }
+        }
+    }
+
+    conf = Config(test_config, base_folder="/tmp")
+
+    # list indices are not indexed
+    _tools.eq_(conf[["etl", "raw", "stations", 0, "local"]], "abc")
+
+    conf[["etl", "raw", "transactions", "local"]] = "xyz"
+    _tools.eq_(conf[["etl", "raw", "transactions", "local_absolute"]], "/tmp/xyz")
+    _tools.eq_(
+        conf[["etl", "raw", "transactions", "name_absolute"]], "/tmp/xyz/def.parquet"
+    )
+
+    conf.set(["model", "rf"], {"local": "rf"})
+    _tools.eq_(conf[["model", "rf", "local_absolute"]], "/tmp/rf")
+
+
+def test_load_cached_config():
+
+    invalidate_config_cache()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, "config.json")
+        with open(config_path, "w") as fp:
+            json.dump({"etl": {"raw": {"local": "abc"}}}, fp)
+
+        conf = load_cached_config("config.json", base_folder=tmp_dir)
+        _tools.eq_(conf[["etl", "raw", "local_absolute"]], os.path.join(tmp_dir, "abc"))
+        _tools.ok_(load_cached_config(config_path) is not conf)
+        _tools.ok_(load_cached_config("config.json", base_folder=tmp_dir) is conf)
+        _tools.eq_(config_cache_info()["hits"], 1)
+        _tools.eq_(config_cache_info()["misses"], 2)
+
+        # modified files are loaded again
+        with open(config_path, "w") as fp:
+            json.dump({"etl": {"raw": {"local": "xyz"}}}, fp)
+        os.utime(config_path, ns=(0, 0))
+        conf_modified = load_cached_config("config.json", base_folder=tmp_dir)
+        _tools.eq_(conf_modified[["etl", "raw", "local"]], "xyz")
+        _tools.eq_(config_cache_info()["currsize"], 2)
+
+        invalidate_config_cache(config_path)
+        _tools.eq_(config_cache_info()["currsize"], 0)
+
+    _tools.assert_raises(Exception, conf.set, ["etl", "raw", "local"], "abc")
+
+
+def test_Config_frozen():
+
+    test_config = {
+        "etl": {
+            "raw": {
+                "transactions": {"local": "abc", "name": "def.parquet", "remote": ""},
+                "stations": [{"local": "abc"}],
+            }
+        }
+    }
+
+    conf = Config(test_config, base_folder="/tmp", frozen=True)
+
+    raw = conf[["etl", "raw"]]
+    _tools.ok_(isinstance(raw, ConfigView))
+    _tools.eq_(raw["transactions"]["local_absolute"], "/tmp/abc")
+    _tools.eq_(raw["stations"], [{"local": "abc"}])
+    _tools.ok_(isinstance(conf[["etl", "raw", "stations", 0]], ConfigView))
+    _tools.assert_raises(TypeError, operator.setitem, raw, "stations", [])
+    _tools.assert_raises(Exception, conf.set, ["etl", "raw"], {})
+
+    # the copies can be changed without changing the config
+    raw_copy = raw.to_dict()
+    raw_copy["transactions"]["local"] = "xyz"
+    _tools.eq_(conf[["etl", "raw", "transactions", "local"]], "abc")
+    _tools.eq_(conf.to_dict(), test_config)
+
+
+def test_Config_snapshot():
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, "config.json")
+        with open(config_path, "w") as fp:
+            json.dump({"etl": {"raw": {"local": "abc", "name": "def.parquet"}}}, fp)
+
+        conf = Config(config_path, base_folder="/tmp", snapshot=True)
+        _tools.ok_(os.path.exists(f"{config_path}.snapshot"))
+
+        conf_snapshot = Config(config_path, base_folder="/tmp", snapshot=True)
+        _tools.eq_(conf_snapshot.config, conf.config)
+        _tools.eq_(
+            conf_snapshot[["etl", "raw", "name_absolute"]], "/tmp/abc/def.parquet"
+        )
+
+        # the snapshot is not used for a different base folder or a changed file
+        _tools.eq_(
+            Config(config_path, base_folder="/data", snapshot=True)[
+                ["etl", "raw", "local_absolute"]
+            ],
+            "/data/abc",
+        )
+        with open(config_path, "w") as fp:
+            json.dump({"etl": {"raw": {"local": "xyz"}}}, fp)
+        _tools.eq_(
+            Config(config_path, base_folder="/tmp", snapshot=True)[
+                ["etl", "raw", "local_absolute"]
+            ],
+            "/tmp/xyz",
+        )
+
+
+def test_Config_changed_in_place():
+
+    conf = Config({"etl": {"raw": {"local": "abc"}}}, base_folder="/tmp")
+
+    conf[["etl", "raw"]]["local"] = "xyz"
+    _tools.eq_(conf[["etl", "raw", "local"]], "xyz")
+    _tools.eq_(conf[["etl", "raw"]]["local"], "xyz")
+
+    conf[["etl"]]["raw"] = {"local": "new"}
+    _tools.eq_(conf[["etl", "raw", "local"]], "new")
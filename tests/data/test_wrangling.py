@@ -1,7 +1,285 @@
+import datetime
+import os
+import tempfile
+
+import pandas as pd
 from nose import tools as _tools
-from haferml.data.wrangle.misc import convert_str_repr_to_list
+from pandas.testing import assert_frame_equal
+from haferml.data.wrangle.datetime import (
+    calendar_features,
+    calendar_table,
+    clear_datetime_format_cache,
+    convert_to_datetime,
+    convert_to_datetime_series,
+    date_range_has_weekday,
+    date_range_has_weekday_series,
+    datetime_format_cache_info,
+    unpack_datetime,
+    unpack_datetime_series,
+)
+from haferml.data.wrangle.flatten import Flattener, flatten_records
+from haferml.data.wrangle.misc import (
+    DictPathExtractor,
+    convert_str_repr_to_list,
+    detect_decimal_convention,
+    float_string_series_to_float,
+    get_all_paths_in_dict,
+    get_value_in_dict_recursively,
+    iter_paths_in_dict,
+)
 
 
 def test_convert_to_list():
 
     _tools.eq_(convert_str_repr_to_list("[1,2,3]"), [1, 2, 3])
+
+
+def test_detect_decimal_convention():
+
+    _tools.eq_(detect_decimal_convention(["1,5", "2.000,25", "1.234"]), "eu")
+    _tools.eq_(detect_decimal_convention(["1.5", "2,000.25", "1,234"]), "us")
+    # ambiguous values fall back to the EU convention
+    _tools.eq_(detect_decimal_convention(["1.234"]), "eu")
+
+
+def test_float_string_series_to_float():
+
+    values, bad = float_string_series_to_float(
+        pd.Series(["1.234,5", "2,5", "abc", None, 3])
+    )
+    _tools.eq_(values.tolist()[:2], [1234.5, 2.5])
+    _tools.eq_(values.tolist()[4], 3.0)
+    _tools.eq_(bad.tolist(), [False, False, True, False, False])
+
+    values, bad = float_string_series_to_float(["1,234.5", "2.5"], convention="us")
+    _tools.eq_(values.tolist(), [1234.5, 2.5])
+
+
+def test_convert_to_datetime_series():
+
+    data = [
+        "2018-07-11 17:33:32",
+        "2018-07-12 08:00:00",
+        1531323212311,
+        None,
+        "11/07/2018",
+        "not a date",
+        datetime.datetime(2020, 1, 1),
+    ]
+    res = convert_to_datetime_series(data, dayfirst=False)
+    _tools.eq_(str(res.dtype), "datetime64[ns, UTC]")
+    for val, converted in zip(data, res):
+        expected = None if val is None else convert_to_datetime(val, dayfirst=False)
+        if expected is None:
+            _tools.ok_(pd.isnull(converted))
+        else:
+            _tools.eq_(converted, expected)
+
+    # the timezone in the input is replaced, the same as convert_to_datetime
+    res = convert_to_datetime_series(
+        pd.Series(["2021-01-02 10:00:00"]),
+        dayfirst=False,
+        input_tz=datetime.timezone(datetime.timedelta(hours=2)),
+    )
+    _tools.eq_(res.iloc[0], pd.Timestamp("2021-01-02 08:00:00", tz="UTC"))
+
+
+def test_convert_to_datetime_series_out_of_bounds():
+
+    # valid-to sentinel dates are out of the range of pandas
+    data = ["9999-12-31", datetime.datetime(9999, 1, 1), "2021-01-02", 1e20]
+    res = convert_to_datetime_series(data, dayfirst=False)
+    _tools.eq_(
+        [pd.isnull(v) for v in res],
+        [True, True, False, True],
+    )
+    _tools.eq_(res.iloc[2], pd.Timestamp("2021-01-02", tz="UTC"))
+    _tools.ok_(pd.isnull(convert_to_datetime_series(pd.Series([1e20])).iloc[0]))
+
+    unpacked = unpack_datetime_series(pd.Series(data[:3]))
+    _tools.eq_(unpacked.year.tolist(), [pd.NA, pd.NA, 2021])
+
+
+def test_convert_to_datetime_format_cache():
+
+    clear_datetime_format_cache()
+    utc = datetime.timezone.utc
+
+    _tools.eq_(
+        convert_to_datetime("2021-01-13 10:00:00"),
+        datetime.datetime(2021, 1, 13, 10, tzinfo=utc),
+    )
+    # the learned format follows dayfirst for ambiguous dates, the same as dateutil
+    _tools.eq_(
+        convert_to_datetime("2021-01-02 10:00:00"),
+        datetime.datetime(2021, 2, 1, 10, tzinfo=utc),
+    )
+    _tools.eq_(
+        convert_to_datetime("2021-01-02 10:00:00", dayfirst=False),
+        datetime.datetime(2021, 1, 2, 10, tzinfo=utc),
+    )
+    _tools.eq_(datetime_format_cache_info()["currsize"], 2)
+    _tools.eq_(datetime_format_cache_info()["hits"], 1)
+
+    clear_datetime_format_cache()
+    _tools.eq_(datetime_format_cache_info()["currsize"], 0)
+
+
+def test_unpack_datetime_series():
+
+    data = ["2021-01-02 10:00:00", 1531323212311]
+    res = unpack_datetime_series(data)
+    _tools.eq_(res.to_dict("records"), [unpack_datetime(i) for i in data])
+    _tools.eq_(res.dtypes.astype(str).tolist(), ["int16", "int8", "int8", "int8"])
+
+    res = unpack_datetime_series(pd.Series(data + [None]))
+    _tools.eq_(res.dtypes.astype(str).tolist(), ["Int16", "Int8", "Int8", "Int8"])
+    _tools.ok_(res.iloc[2].isna().all())
+
+
+def test_date_range_has_weekday():
+
+    # 2021-01-02 is a Saturday
+    _tools.eq_(date_range_has_weekday("2021-01-02", "2021-01-03"), False)
+    _tools.eq_(date_range_has_weekday("2021-01-02", "2021-01-04"), True)
+    _tools.eq_(date_range_has_weekday("2021-01-02 12:00", "2021-01-04 11:00"), False)
+    _tools.eq_(date_range_has_weekday("2021-01-04", "2021-01-02"), False)
+    _tools.eq_(
+        date_range_has_weekday("2021-01-02", "2021-01-04", holidays=["2021-01-04"]),
+        False,
+    )
+    _tools.eq_(
+        date_range_has_weekday("2021-01-02", "2021-01-03", weekmask="0000011"), True
+    )
+    _tools.eq_(date_range_has_weekday(None, "2021-01-03"), None)
+
+    res = date_range_has_weekday_series(
+        pd.Series(["2021-01-02", "2021-01-02", None]),
+        pd.Series(["2021-01-03", "2021-01-04", "2021-01-04"]),
+    )
+    _tools.eq_(res.tolist(), [False, True, pd.NA])
+
+
+def test_calendar_table():
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "calendar.parquet")
+        calendar = calendar_table(
+            "2020-12-01", "2021-01-31", holidays=["2021-01-01"], path=path
+        )
+        cached = calendar_table(
+            "2020-12-01", "2021-01-31", holidays=["2021-01-01"], path=path
+        )
+        rebuilt = calendar_table("2020-12-01", "2021-01-31", path=path)
+
+    pd.testing.assert_frame_equal(calendar, cached)
+    _tools.eq_(rebuilt.is_holiday.sum(), 0)
+
+    res = calendar_features(
+        pd.Series(["2021-01-01 10:00:00", "2021-01-02", None, "2022-01-01"]), calendar
+    )
+    _tools.eq_(res.weekday.tolist()[:2], [5, 6])
+    _tools.eq_(res.is_holiday.tolist()[:2], [True, False])
+    _tools.eq_(res.is_weekend.tolist()[:2], [False, True])
+    _tools.eq_(res.is_business_day.tolist()[:2], [False, False])
+    _tools.ok_(res.iloc[2:].isna().all().all())
+
+
+def test_dict_path_extractor():
+
+    records = [
+        {"user": {"id": 1, "name": "a"}, "items": [{"sku": "x"}, {"sku": "y"}]},
+        {"user": {"id": 2}, "items": []},
+        {"user": None},
+    ]
+    paths = [
+        ["user", "id"],
+        ["user", "name"],
+        ["items", "1", "sku"],
+        ["items", 0],
+        ["user", "id"],
+    ]
+    extractor = DictPathExtractor(paths)
+
+    _tools.eq_(extractor.extract(records[0]), [1, "a", "y", {"sku": "x"}, 1])
+    _tools.eq_(
+        extractor.extract_many(records[:2]),
+        [[get_value_in_dict_recursively(r, p) for p in paths] for r in records[:2]],
+    )
+    _tools.eq_(extractor.extract(records[2]), [None] * 5)
+
+
+def test_iter_paths_in_dict():
+
+    test_dict = {
+        "etl": {"local": "abc", "files": ["a", {"name": "b"}], "empty": {}},
+        "model": None,
+    }
+
+    _tools.eq_(
+        list(iter_paths_in_dict(test_dict)),
+        [
+            ("etl", "local"),
+            ("etl", "files", 0),
+            ("etl", "files", 1, "name"),
+            ("model",),
+        ],
+    )
+    _tools.eq_(
+        list(
+            iter_paths_in_dict(
+                test_dict, max_depth=2, key_filter=lambda k: k != "local"
+            )
+        ),
+        [("etl", "files"), ("etl", "empty"), ("model",)],
+    )
+    _tools.eq_(
+        get_all_paths_in_dict(test_dict),
+        [["etl", "local"], ["etl", "files"], ["model"]],
+    )
+
+
+def test_flattener():
+
+    records = [
+        {"user": {"id": 1, "name": "a"}, "tags": [1, 2], "1": {"x": 1}},
+        {"user": {"id": 2, "address": {"city": "b"}}},
+        {"user": {"id": 3, "name": "c"}},
+    ]
+
+    flattener = Flattener().fit(records[:2])
+    _tools.eq_(
+        flattener.columns, ["user.id", "user.name", "tags", "1.x", "user.address.city"]
+    )
+
+    res = flattener.transform(records)
+    _tools.eq_(res["user.id"].tolist(), [1, 2, 3])
+    _tools.eq_(res["user.name"].tolist(), ["a", None, "c"])
+    _tools.eq_(res["tags"].tolist(), [[1, 2], None, None])
+    assert_frame_equal(flattener.transform(iter(records)), res)
+
+    _tools.eq_(
+        Flattener(include_lists=True).fit(records).columns[:4],
+        ["user.id", "user.name", "tags.0", "tags.1"],
+    )
+    assert_frame_equal(
+        flatten_records(records, sep="__", max_depth=1),
+        pd.DataFrame(
+            {
+                "user": [r["user"] for r in records],
+                "tags": [[1, 2], None, None],
+                "1": [{"x": 1}, None, None],
+            }
+        ),
+    )
+
+
+def test_flattener_duplicated_columns():
+
+    records = [{"a.b": 1, "a": {"b": 2}}]
+
+    _tools.assert_raises(Exception, flatten_records, records)
+    _tools.assert_raises(Exception, Flattener, paths=[("a.b",), ("a", "b")])
+
+    res = flatten_records(records, sep="/")
+    _tools.eq_(res.to_dict("records"), [{"a.b": 1, "a/b": 2}])
@@ -1,2 +1,371 @@
+import copy
+import datetime
+import gc
+import os
+import pickle
+import tempfile
+
+import pandas as pd
+import simplejson as json
 from nose import tools as _tools
+from haferml.etl.transform.ingredients import ErrorCollector
 from haferml.etl.transform.pipeline import Transformer
+from pandas.testing import assert_frame_equal
+
+
+class DemoTransformer(Transformer):
+    def _transformer__label(self, data):
+        return f"{data}-{self.record['name']}"
+
+
+demo_schema = [
+    {"column_name": "name", "type": "str"},
+    {"column_name": "count", "type": "int"},
+    {"column_name": "price", "type": "float"},
+    {"column_name": "created_at", "type": "datetime"},
+    {"column_name": "active", "type": "bool"},
+    {"column_name": "tags", "type": "list"},
+    {"column_name": "label", "type": "str"},
+]
+
+demo_records = [
+    {
+        "name": " a ",
+        "count": "1.234,5",
+        "price": "1,5",
+        "created_at": "2021-01-02 10:00:00",
+        "active": "yes",
+        "tags": "[1, 2]",
+        "label": 1,
+    },
+    {
+        "name": None,
+        "count": 3,
+        "price": 2.5,
+        "created_at": 1531323212311,
+        "active": 0,
+        "tags": None,
+        "label": 2,
+    },
+    {
+        "name": 5,
+        "count": "not a number",
+        "price": "nan",
+        "created_at": None,
+        "active": "maybe",
+        "tags": "[3]",
+        "label": 3,
+    },
+]
+
+
+def test_transform():
+
+    transformer = DemoTransformer(demo_schema)
+    record = transformer.transform(copy.deepcopy(demo_records[0]))
+
+    _tools.eq_(record["name"], "a")
+    _tools.eq_(record["count"], 1234)
+    _tools.eq_(record["price"], 1.5)
+    _tools.eq_(record["active"], True)
+    _tools.eq_(record["tags"], [1, 2])
+    _tools.eq_(record["label"], "1- a ")
+
+
+def test_transform_dataframe():
+
+    transformer = DemoTransformer(demo_schema)
+
+    expected = pd.DataFrame(
+        [transformer.transform(r) for r in copy.deepcopy(demo_records)]
+    )
+    transformed = transformer.transform_dataframe(pd.DataFrame(demo_records))
+
+    assert_frame_equal(transformed, expected)
+
+
+@_tools.raises(Exception)
+def test_transform_dataframe_unknown_column():
+
+    transformer = DemoTransformer(demo_schema)
+    transformer.transform_dataframe(pd.DataFrame([{"not_in_schema": 1}]))
+
+
+def test_transform_stream():
+
+    transformer = DemoTransformer(demo_schema)
+    records = copy.deepcopy(demo_records)
+
+    expected = [transformer.transform(r) for r in copy.deepcopy(demo_records)]
+    batches = list(transformer.transform_stream(iter(records), batch_size=2))
+
+    _tools.eq_([len(b) for b in batches], [2, 1])
+    _tools.eq_(str([r for b in batches for r in b]), str(expected))
+    # the input records are not modified
+    _tools.eq_(records, demo_records)
+
+
+def test_transformer_pickle():
+
+    expected = str(
+        DemoTransformer(demo_schema).transform(copy.deepcopy(demo_records[0]))
+    )
+    # the closures of the caches and the statistics are rebuilt after unpickling
+    for params in [{}, {"cache_size": 10}, {"collect_stats": True}]:
+        transformer = pickle.loads(pickle.dumps(DemoTransformer(demo_schema, **params)))
+
+        _tools.eq_(str(transformer.transform(copy.deepcopy(demo_records[0]))), expected)
+        batches = list(transformer.transform_stream([copy.deepcopy(demo_records[0])]))
+        _tools.eq_(str(batches[0][0]), expected)
+
+
+def test_transform_many():
+
+    transformer = DemoTransformer(demo_schema)
+    records = [copy.deepcopy(r) for r in demo_records * 5]
+
+    expected = [transformer.transform(copy.deepcopy(r)) for r in records]
+
+    _tools.eq_(
+        str(transformer.transform_many(records, workers=2, chunk_size=4)),
+        str(expected),
+    )
+    _tools.eq_(
+        str(transformer.transform_many(records, workers=1, chunk_size=4)),
+        str(expected),
+    )
+
+
+def test_transform_errors_quarantine():
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        quarantine_path = os.path.join(tmp_dir, "quarantine.jsonl")
+        transformer = DemoTransformer(
+            demo_schema,
+            error_collector=ErrorCollector(quarantine_path=quarantine_path),
+        )
+        for _ in transformer.transform_stream(copy.deepcopy(demo_records) * 3):
+            pass
+
+        _tools.eq_(transformer.errors.summary(), {"total": 3, "columns": {"count": 3}})
+
+        with open(quarantine_path, "r") as fp:
+            quarantined = [json.loads(line) for line in fp]
+
+    _tools.eq_(len(quarantined), 3)
+    _tools.eq_(quarantined[0]["count"], "not a number")
+
+
+def test_transform_cache():
+
+    transformer = DemoTransformer(
+        [
+            {"column_name": "created_at", "type": "datetime", "cache_size": 16},
+            {"column_name": "price", "type": "float"},
+        ]
+    )
+    records = [
+        {"created_at": "2021-01-02 10:00:00", "price": "1,5"},
+        {"created_at": "2021-01-02 10:00:00", "price": "1,5"},
+        {"created_at": "2021-01-03 10:00:00", "price": "2,5"},
+    ]
+    transformed = [transformer.transform(r) for r in copy.deepcopy(records)]
+
+    _tools.eq_(transformed[0], transformed[1])
+    _tools.eq_(
+        transformer.cache_info(),
+        {"created_at": {"hits": 1, "misses": 2, "maxsize": 16, "currsize": 2}},
+    )
+
+
+def test_transform_to_parquet():
+
+    transformer = DemoTransformer(demo_schema)
+    expected = pd.DataFrame(
+        [transformer.transform(r) for r in copy.deepcopy(demo_records)]
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parquet_path = os.path.join(tmp_dir, "transformed.parquet")
+        total = transformer.transform_to_parquet(
+            copy.deepcopy(demo_records), parquet_path, batch_size=2
+        )
+        transformed = pd.read_parquet(parquet_path)
+
+    _tools.eq_(total, 3)
+    _tools.eq_(list(transformed.columns), [c["column_name"] for c in demo_schema])
+    _tools.ok_(str(transformed.created_at.dtype).startswith("datetime64"))
+    _tools.eq_(transformed["count"].tolist()[:2], [1234, 3])
+    # failed values are written as nulls
+    _tools.ok_(pd.isnull(transformed["count"].iloc[2]))
+    _tools.eq_(transformed.label.tolist(), expected.label.tolist())
+
+
+def test_transform_stats():
+
+    transformer = DemoTransformer(demo_schema, collect_stats=True)
+    for _ in transformer.transform_stream(copy.deepcopy(demo_records)):
+        pass
+    transformer.transform_dataframe(pd.DataFrame(demo_records))
+
+    stats = transformer.stats()
+
+    _tools.eq_(stats["count"]["calls"], 6)
+    _tools.eq_(stats["count"]["failures"], 2)
+    _tools.ok_(stats["count"]["time"] > 0)
+    _tools.eq_(stats["label"]["calls"], 6)
+
+
+class VectorizedTransformer(Transformer):
+    def _vtransformer__station(self, data):
+        return data.astype(str).str.strip().str.upper()
+
+    def _vtransformer__code(self, data):
+        raise ValueError("falling back to _transformer__code")
+
+    def _transformer__code(self, data):
+        return f"code-{data}"
+
+
+def test_vtransformer():
+
+    transformer = VectorizedTransformer(
+        [
+            {"column_name": "station", "type": "str"},
+            {"column_name": "code", "type": "str"},
+            {"column_name": "count", "type": "int"},
+        ]
+    )
+    records = [
+        {"station": " ab ", "code": 1, "count": "1"},
+        {"station": "cd", "code": 2, "count": "2"},
+    ]
+    expected = [
+        {"station": "AB", "code": "code-1", "count": 1},
+        {"station": "CD", "code": "code-2", "count": 2},
+    ]
+
+    _tools.eq_([transformer.transform(r) for r in copy.deepcopy(records)], expected)
+    _tools.eq_(list(transformer.transform_stream(records)), [expected])
+    assert_frame_equal(
+        transformer.transform_dataframe(pd.DataFrame(records)),
+        pd.DataFrame(expected),
+    )
+
+
+def test_transform_date():
+
+    transformer = Transformer([{"column_name": "day", "type": "date"}])
+    records = [
+        {"day": "2021-01-02"},
+        {"day": "2021-01-02 10:00:00"},
+        {"day": 1531323212311},
+        {"day": None},
+    ]
+
+    expected = [transformer.transform(r) for r in copy.deepcopy(records)]
+    _tools.eq_(
+        [r["day"] for r in expected],
+        [
+            datetime.date(2021, 1, 2),
+            datetime.date(2021, 1, 2),
+            datetime.date(2018, 7, 11),
+            None,
+        ],
+    )
+    assert_frame_equal(
+        transformer.transform_dataframe(pd.DataFrame(records)),
+        pd.DataFrame(expected),
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parquet_path = os.path.join(tmp_dir, "transformed.parquet")
+        transformer.transform_to_parquet(copy.deepcopy(records), parquet_path)
+        transformed = pd.read_parquet(parquet_path)
+
+    # date32 columns are read as datetime.date
+    _tools.eq_(transformed.day.tolist()[:3], [r["day"] for r in expected][:3])
+
+
+def test_transform_errors_quarantine_transform():
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        quarantine_path = os.path.join(tmp_dir, "quarantine.jsonl")
+        with ErrorCollector(quarantine_path=quarantine_path) as errors:
+            transformer = DemoTransformer(demo_schema, error_collector=errors)
+            for _ in range(5):
+                transformer.transform(copy.deepcopy(demo_records[2]))
+            _tools.ok_(not os.path.exists(quarantine_path))
+
+        with open(quarantine_path, "r") as fp:
+            _tools.eq_(len(fp.readlines()), 5)
+
+        # the buffered records are written when the collector is garbage collected
+        quarantine_path = os.path.join(tmp_dir, "quarantine_gc.jsonl")
+        transformer = DemoTransformer(
+            demo_schema,
+            error_collector=ErrorCollector(quarantine_path=quarantine_path),
+        )
+        transformer.transform(copy.deepcopy(demo_records[2]))
+        del transformer
+        gc.collect()
+
+        with open(quarantine_path, "r") as fp:
+            _tools.eq_(len(fp.readlines()), 1)
+
+
+def test_transform_to_parquet_types():
+
+    transformer = Transformer(
+        [
+            {"column_name": "tags", "type": "list"},
+            {"column_name": "count", "type": "int"},
+        ]
+    )
+    records = [
+        {"tags": None, "count": 1},
+        {"tags": None, "count": "1e30"},
+        {"tags": "[1, 2]", "count": 2},
+        {"tags": "['x']", "count": 3},
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parquet_path = os.path.join(tmp_dir, "transformed.parquet")
+        total = transformer.transform_to_parquet(records, parquet_path, batch_size=2)
+        transformed = pd.read_parquet(parquet_path)
+
+    _tools.eq_(total, 4)
+    # the list column only has nulls in the first batch
+    _tools.eq_(transformed.tags.iloc[2].tolist(), [1, 2])
+    # values that do not fit the types are nulls
+    _tools.ok_(transformed.tags.iloc[3] is None)
+    _tools.eq_(transformed["count"].tolist()[::2], [1, 2])
+    _tools.ok_(pd.isnull(transformed["count"].iloc[1]))
+    _tools.eq_(
+        transformer.errors.summary(), {"total": 2, "columns": {"count": 1, "tags": 1}}
+    )
+
+
+def test_transform_errors_quarantine_nan():
+
+    records = [{"count": "not a number", "price": float("nan")}, {"count": 1}]
+    schema = [
+        {"column_name": "count", "type": "int"},
+        {"column_name": "price", "type": "float"},
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        quarantine_path = os.path.join(tmp_dir, "quarantine.jsonl")
+        transformer = Transformer(
+            schema, error_collector=ErrorCollector(quarantine_path=quarantine_path)
+        )
+        for _ in transformer.transform_stream(copy.deepcopy(records)):
+            pass
+        transformer.transform_dataframe(pd.DataFrame(records))
+
+        with open(quarantine_path, "r") as fp:
+            quarantined = [json.loads(line) for line in fp]
+
+    _tools.eq_(len(quarantined), 2)
+    _tools.eq_(quarantined[0], {"count": "not a number", "price": None})
+    _tools.eq_(quarantined[1], {"count": "not a number", "price": None})
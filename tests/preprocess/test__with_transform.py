@@ -1,6 +1,7 @@
-from haferml.preprocess.ingredients import attributes
+from haferml.preprocess.ingredients import OrderedProcessor, attributes
 from haferml.preprocess.ingredients import with_transforms
 from loguru import logger
+from nose import tools as _tools
 
 
 class AGoodClass:
@@ -27,3 +28,44 @@ class AGoodClass:
 a = AGoodClass()
 
 a.bench("a name")
+
+
+class AnOrderedProcessor(OrderedProcessor):
+    def __init__(self, **params):
+        self.evaluated = 0
+        super(AnOrderedProcessor, self).__init__(**params)
+
+    @property
+    def expensive(self):
+        self.evaluated += 1
+        return 1
+
+    @attributes(order=2)
+    def b_member(self, new):
+        return f"{new} b"
+
+    @attributes(order=2)
+    def a_member(self, new):
+        return f"{new} a"
+
+    @attributes(order=1)
+    def c_member(self, new):
+        return f"{new} c"
+
+
+def test_ordered_processor():
+
+    p = AnOrderedProcessor()
+
+    _tools.eq_(list(p.transforms), ["c_member", "a_member", "b_member"])
+    _tools.eq_(p.transforms["a_member"]("x"), "x a")
+    _tools.eq_(p.evaluated, 0)
+    _tools.ok_(AnOrderedProcessor().transforms["a_member"].__self__ is not p)
+
+
+def test_with_transforms_binds_instance():
+
+    _tools.eq_(a.bench.__name__, "bench")
+    b = AGoodClass()
+    b.bench("another name")
+    _tools.ok_(b.transforms["first_good_member"].__self__ is b)